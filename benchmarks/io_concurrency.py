@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+"""
+Compare sequential and concurrent file reading on a slow filesystem.
+
+The filesystem is simulated by a FileHandler whose reads sleep for a fixed
+latency, standing in for NFS round trips. With ccprompt installed
+(`make dev-install`), run:
+
+    python benchmarks/io_concurrency.py --files 200 --latency 0.005
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from ccprompt.parsers.python_parser import DefinitionFinder, FileHandler
+
+
+class SlowFileHandler(FileHandler):
+    def __init__(self, latency, io_concurrency=1):
+        super().__init__(io_concurrency)
+        self.latency = latency
+
+    def read_file(self, file_path):
+        time.sleep(self.latency)
+        return super().read_file(file_path)
+
+
+def create_tree(directory, file_count):
+    for i in range(file_count):
+        package = os.path.join(directory, f"package_{i % 10}")
+        os.makedirs(package, exist_ok=True)
+        with open(os.path.join(package, f"module_{i}.py"), "w") as f:
+            f.write(f"class Class{i}(Base):\n    def method(self):\n        pass\n")
+
+
+def run(directory, latency, io_concurrency):
+    file_handler = SlowFileHandler(latency, io_concurrency)
+    definition_finder = DefinitionFinder()
+    start_time = time.perf_counter()
+    definitions = 0
+    for file_path, file_content in file_handler.get_python_files([directory]):
+        definitions += len(
+            definition_finder.find_all_definitions(file_path, file_content)
+        )
+    return time.perf_counter() - start_time, definitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        create_tree(directory, args.files)
+        print(f"{args.files} files, {args.latency * 1000:.1f} ms latency per read")
+        baseline = None
+        for io_concurrency in args.concurrency:
+            elapsed, definitions = run(directory, args.latency, io_concurrency)
+            baseline = baseline or elapsed
+            print(
+                f"io_concurrency={io_concurrency:<3} {elapsed:.3f}s "
+                f"({baseline / elapsed:.1f}x, {definitions} definitions)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+"""
+Measure the peak memory of an extraction against the size of the source tree.
+
+Every module of the generated tree defines the target function, so each one
+contributes a block to the output. Peak memory is traced with tracemalloc,
+with and without the low-memory mode. With ccprompt installed
+(`make dev-install`), run:
+
+    python benchmarks/low_memory.py --files 250 500 1000 --lines 200
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import tracemalloc
+
+from ccprompt.main import extract_code
+
+
+def create_tree(directory, file_count, line_count):
+    body = "".join(f"    value_{i} = {i} * 2\n" for i in range(line_count))
+    for i in range(file_count):
+        package = os.path.join(directory, f"package_{i % 10}")
+        os.makedirs(package, exist_ok=True)
+        with open(os.path.join(package, f"module_{i}.py"), "w") as f:
+            f.write(f"def target():\n{body}\n\nclass Class{i}:\n    pass\n")
+
+
+def run(directory, output_file, low_memory, io_concurrency):
+    tracemalloc.start()
+    extract_code(
+        ["target"],
+        directory,
+        output_file=output_file,
+        logger=logging.getLogger("benchmark"),
+        io_concurrency=io_concurrency,
+        low_memory=low_memory,
+    )
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, nargs="+", default=[250, 500, 1000])
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    for file_count in args.files:
+        with tempfile.TemporaryDirectory() as directory:
+            tree = os.path.join(directory, "tree")
+            create_tree(tree, file_count, args.lines)
+            output_file = os.path.join(directory, "extracted_code.txt")
+            default = run(tree, output_file, False, args.concurrency)
+            low_memory = run(tree, output_file, True, args.concurrency)
+            print(
+                f"{file_count:>6} files  default {default / 2**20:7.2f} MiB  "
+                f"low-memory {low_memory / 2**20:7.2f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -6,3 +6,8 @@
 # modify it under the terms of the MIT License; see LICENSE file details.
 
 __version__ = "0.3.0"
+
+from .api import ExtractionResult, Project, extract, iter_extract
+from .parsers.search_root import SearchRoot
+
+__all__ = ["ExtractionResult", "Project", "SearchRoot", "extract", "iter_extract"]
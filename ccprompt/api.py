@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+"""
+Library API, returning the extracted blocks instead of writing a file:
+
+    import ccprompt
+
+    result = ccprompt.extract(["MyClass"], "path/to/project")
+    prompt = result.render("markdown")
+
+    # Keep the index warm between requests
+    project = ccprompt.Project("path/to/project", "path/to/site-packages")
+    for block in project.iter_extract(["my_function"]):
+        ...
+"""
+
+import logging
+
+from .main import iter_blocks
+from .output import collapse_duplicates, serialize_block
+from .parser_factory import ParserFactory
+from .parsers.file_limits import FileLimits
+from .parsers.multi_language_parser import MultiLanguageParser
+from .parsers.parse_pool import DEFAULT_PARSE_TIMEOUT
+from .parsers.record_cache import default_file_cache_dir
+from .parsers.search_root import order_search_roots
+from .ranking import BlockRanker
+from .result_cache import ResultCache
+
+
+class ExtractionResult:
+    """
+    Blocks extracted for a set of targets, in output order. Each block is a
+    dict with `file_path`, `qualname`, `kind`, `start_line`, `end_line`,
+    `depth` and `source`, and `duplicate_paths` once merged with identical
+    blocks of other files. `skipped_files` lists the `(file_path, reason,
+    elapsed)` of the files the project skipped so far.
+    """
+
+    def __init__(self, blocks, skipped_files):
+        self.blocks = blocks
+        self.skipped_files = skipped_files
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def render(self, output_format="text"):
+        """Return the blocks as they would be written to an output file."""
+        data = [serialize_block(block, output_format) for block in self.blocks]
+        if output_format == "json":
+            return "[\n" + ",\n".join(data) + "\n]\n"
+        return "".join(data)
+
+
+class Project:
+    """
+    A project and its search directories, with the index of their
+    definitions built on the first extraction and reused by the next ones.
+
+    A Project can be shared by threads serving concurrent extractions: the
+    index is built once and only read afterwards. It doesn't watch the files,
+    call `refresh` after they changed.
+    """
+
+    def __init__(
+        self,
+        project_path,
+        venv_site_packages_path=None,
+        language="python",
+        logger=None,
+        index_cache_dir=None,
+        use_index_cache=False,
+        io_concurrency=1,
+        use_result_cache=False,
+        use_git_index=False,
+        parse_workers=1,
+        parse_timeout=DEFAULT_PARSE_TIMEOUT,
+        max_file_size=None,
+        parse_time_budget=None,
+        skip_generated=False,
+        use_file_cache=False,
+        file_cache_dir=None,
+        file_cache_max_size=None,
+        search_roots=None,
+        shard_index_dir=None,
+    ):
+        self.language = language
+        self.logger = logger or logging.getLogger(__name__)
+        if search_roots:
+            search_roots = order_search_roots(search_roots)
+            self.search_directories = [search_root.path for search_root in search_roots]
+        else:
+            self.search_directories = [project_path]
+            if venv_site_packages_path:
+                self.search_directories.append(venv_site_packages_path)
+        self.file_limits = FileLimits(max_file_size, parse_time_budget, skip_generated)
+        if use_file_cache:
+            file_cache_dir = file_cache_dir or default_file_cache_dir(project_path)
+        else:
+            file_cache_dir = None
+        parser = ParserFactory.get_parser(
+            language,
+            logger=self.logger,
+            index_cache_dir=index_cache_dir,
+            use_index_cache=use_index_cache,
+            io_concurrency=io_concurrency,
+            use_git_index=use_git_index,
+            parse_workers=parse_workers,
+            parse_timeout=parse_timeout,
+            file_limits=self.file_limits,
+            file_cache_dir=file_cache_dir,
+            file_cache_max_size=file_cache_max_size,
+            search_roots=search_roots,
+            shard_index_dir=shard_index_dir,
+            project_path=project_path,
+        )
+        if not isinstance(parser, MultiLanguageParser):
+            # Serve every lookup from the index instead of walking the files
+            parser = MultiLanguageParser(
+                {".py": parser},
+                parser.file_handler,
+                self.logger,
+                file_limits=self.file_limits,
+            )
+        self.parser = parser
+        self.result_cache = (
+            ResultCache(
+                index_cache_dir,
+                self.logger,
+                use_git_index,
+                search_roots,
+                skip_generated=skip_generated,
+                max_file_size=max_file_size,
+                shard_index_dir=shard_index_dir,
+            )
+            if use_result_cache
+            else None
+        )
+
+    def extract(
+        self,
+        target_names,
+        subclasses=None,
+        overrides=None,
+        first_match=False,
+        rank=False,
+        top_k=None,
+        budget=None,
+        collapse_duplicate_blocks=False,
+    ):
+        """
+        Return the blocks of `target_names` as an ExtractionResult. With
+        `rank`, `top_k` or `budget`, they are ordered and selected, and with
+        `collapse_duplicate_blocks` identical blocks merged, as `extract_code`
+        does.
+        """
+        blocks = list(
+            self.iter_extract(target_names, subclasses, overrides, first_match)
+        )
+        if collapse_duplicate_blocks:
+            blocks = collapse_duplicates(blocks)
+        if rank or top_k or budget:
+            ranker = BlockRanker(self.search_directories, top_k, budget)
+            blocks = ranker.rank(blocks)
+        return ExtractionResult(blocks, self.file_limits.report.get_entries())
+
+    def iter_extract(
+        self, target_names, subclasses=None, overrides=None, first_match=False
+    ):
+        """Yield the blocks of `extract` one at a time, as they are found."""
+        for block in iter_blocks(
+            self.parser,
+            target_names,
+            self.search_directories,
+            self.language,
+            self.logger,
+            subclasses=subclasses,
+            overrides=overrides,
+            first_match=first_match,
+            result_cache=self.result_cache,
+        ):
+            block = dict(block)  # Cached blocks are shared between calls
+            block.pop("class_name", None)
+            yield block
+
+    def refresh(self):
+        """Drop the index, the next extraction reads the files again."""
+        self.parser.clear_indexes()
+
+
+def extract(
+    target_names,
+    project_path,
+    venv_site_packages_path=None,
+    language="python",
+    subclasses=None,
+    overrides=None,
+    first_match=False,
+    rank=False,
+    top_k=None,
+    budget=None,
+    collapse_duplicate_blocks=False,
+    **options,
+):
+    """
+    Extract the code of `target_names` as `extract_code` does and return it
+    as an ExtractionResult. `options` are passed to Project.
+    """
+    project = Project(project_path, venv_site_packages_path, language, **options)
+    return project.extract(
+        target_names,
+        subclasses,
+        overrides,
+        first_match,
+        rank,
+        top_k,
+        budget,
+        collapse_duplicate_blocks,
+    )
+
+
+def iter_extract(
+    target_names,
+    project_path,
+    venv_site_packages_path=None,
+    language="python",
+    subclasses=None,
+    overrides=None,
+    first_match=False,
+    **options,
+):
+    """Streaming variant of `extract`, yielding blocks as they are found."""
+    project = Project(project_path, venv_site_packages_path, language, **options)
+    yield from project.iter_extract(target_names, subclasses, overrides, first_match)
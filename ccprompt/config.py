@@ -8,12 +8,21 @@
 import os
 import json
 import sys
+from .parsers.parse_pool import DEFAULT_PARSE_TIMEOUT
+from .parsers.search_root import SearchRoot
 
 
 class Config:
-    def __init__(self, config_file, args):
+    """
+    Options of the configuration file, overridden by the command-line `args`.
+    Without `extraction`, as for `ccprompt index build`, the file is optional
+    and no target is required.
+    """
+
+    def __init__(self, config_file, args, extraction=True):
         self.config_file = config_file
         self.args = args
+        self.extraction = extraction
         self.load_config()
 
     def load_config(self):
@@ -24,11 +33,39 @@ class Config:
             "exclude_venv": False,
             "output_file": "extracted_code.txt",
             "language": "python",
+            "subclasses": [],
+            "overrides": [],
+            "use_index_cache": True,
+            "index_cache_dir": "",
+            "io_concurrency": 1,
+            "first_match": False,
+            "use_result_cache": False,
+            "use_git_index": False,
+            "output_format": "text",
+            "compression": None,
+            "chunk_size": None,
+            "low_memory": False,
+            "parse_workers": 1,
+            "parse_timeout": DEFAULT_PARSE_TIMEOUT,
+            "max_file_size": None,
+            "parse_time_budget": None,
+            "skip_generated": False,
+            "use_file_cache": False,
+            "file_cache_dir": "",
+            "file_cache_max_size": None,
+            "rank": False,
+            "top_k": None,
+            "budget": None,
+            "search_roots": [],
+            "collapse_duplicates": False,
+            "shard_index_dir": "",
         }
 
         # If config file does not exist or is empty, create it with default config
         config_needs_creation = False
-        if not os.path.exists(self.config_file):
+        if not self.extraction:
+            pass  # The file is optional, don't create it
+        elif not os.path.exists(self.config_file):
             config_needs_creation = True
             print(
                 f"No configuration file found. Creating default config file at {self.config_file}."
@@ -51,10 +88,12 @@ class Config:
                 sys.exit(1)
 
         # Load existing config file
+        config = {}
         try:
-            with open(self.config_file, "r") as f:
-                config_content = f.read()
-                config = json.loads(config_content)
+            if os.path.exists(self.config_file):
+                with open(self.config_file, "r") as f:
+                    config_content = f.read()
+                    config = json.loads(config_content)
         except Exception as e:
             print(f"Error loading configuration file {self.config_file}: {e}")
             sys.exit(1)
@@ -84,12 +123,117 @@ class Config:
             else config.get("language", "python")
         )
 
-        # Ensure target_name is a list
+        self.subclasses = (
+            self.args.subclasses
+            if self.args.subclasses
+            else config.get("subclasses", [])
+        )
+        self.overrides = (
+            self.args.overrides if self.args.overrides else config.get("overrides", [])
+        )
+        self.use_index_cache = not self.args.no_index_cache and config.get(
+            "use_index_cache", True
+        )
+        self.index_cache_dir = (
+            self.args.index_cache_dir
+            if self.args.index_cache_dir
+            else config.get("index_cache_dir", "")
+        )
+        self.io_concurrency = (
+            self.args.io_concurrency
+            if self.args.io_concurrency
+            else config.get("io_concurrency", 1)
+        )
+        self.first_match = self.args.first_match or config.get("first_match", False)
+        self.use_result_cache = self.args.result_cache or config.get(
+            "use_result_cache", False
+        )
+        self.use_git_index = self.args.git_index or config.get("use_git_index", False)
+        self.output_format = (
+            self.args.format
+            if self.args.format
+            else config.get("output_format", "text")
+        )
+        self.compression = (
+            self.args.compression
+            if self.args.compression
+            else config.get("compression")
+        )
+        self.chunk_size = (
+            self.args.chunk_size if self.args.chunk_size else config.get("chunk_size")
+        )
+        self.low_memory = self.args.low_memory or config.get("low_memory", False)
+        self.parse_workers = (
+            self.args.parse_workers
+            if self.args.parse_workers
+            else config.get("parse_workers", 1)
+        )
+        self.parse_timeout = (
+            self.args.parse_timeout
+            if self.args.parse_timeout
+            else config.get("parse_timeout", DEFAULT_PARSE_TIMEOUT)
+        )
+        self.max_file_size = (
+            self.args.max_file_size
+            if self.args.max_file_size
+            else config.get("max_file_size")
+        )
+        self.parse_time_budget = (
+            self.args.parse_time_budget
+            if self.args.parse_time_budget
+            else config.get("parse_time_budget")
+        )
+        self.skip_generated = self.args.skip_generated or config.get(
+            "skip_generated", False
+        )
+        self.use_file_cache = self.args.file_cache or config.get(
+            "use_file_cache", False
+        )
+        self.file_cache_dir = (
+            self.args.file_cache_dir
+            if self.args.file_cache_dir
+            else config.get("file_cache_dir", "")
+        )
+        self.file_cache_max_size = (
+            self.args.file_cache_max_size
+            if self.args.file_cache_max_size
+            else config.get("file_cache_max_size")
+        )
+        self.rank = self.args.rank or config.get("rank", False)
+        self.top_k = self.args.top_k if self.args.top_k else config.get("top_k")
+        self.budget = self.args.budget if self.args.budget else config.get("budget")
+        self.collapse_duplicates = self.args.collapse_duplicates or config.get(
+            "collapse_duplicates", False
+        )
+        self.shard_index_dir = (
+            self.args.shard_index_dir
+            if self.args.shard_index_dir
+            else config.get("shard_index_dir", "")
+        )
+        search_roots = (
+            self.args.search_roots
+            if self.args.search_roots
+            else config.get("search_roots", [])
+        )
+        try:
+            self.search_roots = [
+                SearchRoot.from_config(entry) for entry in search_roots
+            ]
+        except ValueError as e:
+            print(f"Error in configuration file {self.config_file}: {e}")
+            sys.exit(1)
+
+        # Ensure target_name, subclasses and overrides are lists
         if isinstance(self.target_name, str):
             self.target_name = self.target_name.split(",")
+        if isinstance(self.subclasses, str):
+            self.subclasses = self.subclasses.split(",")
+        if isinstance(self.overrides, str):
+            self.overrides = self.overrides.split(",")
 
         # Check if required configurations are provided
-        if not self.target_name or not self.project_path:
+        has_queries = self.target_name or self.subclasses or self.overrides
+        if self.extraction and (not has_queries or not self.project_path):
             print(
                 "\nError: You must provide both function/class names and a project path in the configuration file or via command-line arguments."
             )
@@ -6,11 +6,25 @@
 # modify it under the terms of the MIT License; see LICENSE file details.
 
 import argparse
+import ast
+import builtins
+import os
+import sys
 from pathlib import Path
 from .config import Config
+from .output import COMPRESSIONS, OUTPUT_FORMATS, OutputWriter, collapse_duplicates
 from .parser_factory import ParserFactory
+from .parsers.base_parser import get_base_names
+from .parsers.file_limits import FileLimits
+from .parsers.parse_pool import DEFAULT_PARSE_TIMEOUT
+from .parsers.record_cache import FileRecordCache, default_file_cache_dir
+from .parsers.search_root import order_search_roots
+from .parsers.shard_index import build_index, default_index_dir, merge_indexes
+from .parsers.symbol_index import short_name
+from .ranking import BlockRanker
+from .result_cache import ResultCache
 from ccprompt import __version__
-from ccprompt.utils import time_it
+from ccprompt.utils import get_search_root_index, time_it
 
 
 @time_it
@@ -21,97 +35,564 @@ def extract_code(
     output_file="extracted_code.txt",
     language="python",
     logger=None,
+    subclasses=None,
+    overrides=None,
+    index_cache_dir=None,
+    use_index_cache=False,
+    io_concurrency=1,
+    first_match=False,
+    use_result_cache=False,
+    use_git_index=False,
+    output_format="text",
+    compression=None,
+    chunk_size=None,
+    low_memory=False,
+    parse_workers=1,
+    parse_timeout=DEFAULT_PARSE_TIMEOUT,
+    max_file_size=None,
+    parse_time_budget=None,
+    skip_generated=False,
+    use_file_cache=False,
+    file_cache_dir=None,
+    file_cache_max_size=None,
+    rank=False,
+    top_k=None,
+    budget=None,
+    search_roots=None,
+    collapse_duplicate_blocks=False,
+    shard_index_dir=None,
 ):
     """
     Extract relevant code based on a list of function or class names.
     Include all their inheritance and related upper-level code.
+    Optionally include every subclass of the `subclasses` base classes and every
+    class-level definition of the `overrides` methods.
+    With `use_index_cache`, the index of installed distributions is shared
+    through the content-addressed cache in `index_cache_dir`.
+    `io_concurrency` sets how many files are read concurrently ahead of parsing.
+    With `first_match`, only the first definition of each target is kept and the
+    search stops there, so later search roots (site-packages) may be skipped.
+    With `use_result_cache`, the result of each target is cached together with
+    the files it came from and reused as long as none of them changed.
+    With `use_git_index`, files of git working trees are listed from the git
+    index instead of walking the directories, and its stat data is used to
+    validate cached results.
+    Blocks are streamed to `output_file` as `output_format` (text, json, jsonl
+    or markdown), optionally compressed and split in chunks of `chunk_size`
+    bytes.
+    With `low_memory`, files are parsed one at a time and only the byte offsets
+    of definitions are kept, their source is read back from disk when written.
+    With `parse_workers` above 1, JavaScript files are parsed in that
+    many worker processes, giving up on files that take over `parse_timeout`
+    seconds, 30 by default.
+    Files larger than `max_file_size` bytes are not read, parsing a file stops
+    after `parse_time_budget` seconds and with `skip_generated`, minified or
+    generated files are not parsed. Skipped and unparsable files are reported
+    at the end of the run.
+    With `use_file_cache`, the definitions found in each Python file are kept
+    in `file_cache_dir` (`__ccprompt_cache__` in the project by default), up to
+    `file_cache_max_size` bytes, and reused while the file is unchanged.
+    With `rank`, blocks are written most relevant first instead of in discovery
+    order; `top_k` keeps only that many blocks and `budget` only the best ones
+    whose sources fit in that many characters (both imply `rank`).
+    `search_roots`, a list of SearchRoot, replaces the project and
+    site-packages as the directories searched, by descending priority. The
+    roots are walked concurrently.
+    Identical files found under several paths are parsed once; with
+    `collapse_duplicate_blocks`, their identical blocks are written once,
+    listing every path.
+    With `shard_index_dir`, Python lookups are answered from the sharded index
+    built there by `ccprompt index build`, loading only the shards holding the
+    names looked up. Its paths are relative to `project_path`.
     """
     if logger is None:
         import logging
 
         logger = logging.getLogger(__name__)
 
-    output_content = []
-    visited_classes = set()
-    search_directories = [project_path]
-    if venv_site_packages_path:
-        search_directories.append(venv_site_packages_path)
+    if search_roots:
+        search_roots = order_search_roots(search_roots)
+        search_directories = [search_root.path for search_root in search_roots]
+    else:
+        search_directories = [project_path]
+        if venv_site_packages_path:
+            search_directories.append(venv_site_packages_path)
+
+    file_limits = FileLimits(max_file_size, parse_time_budget, skip_generated)
+    if use_file_cache:
+        file_cache_dir = file_cache_dir or default_file_cache_dir(project_path)
+    else:
+        file_cache_dir = None
+    parser = ParserFactory.get_parser(
+        language,
+        logger=logger,
+        index_cache_dir=index_cache_dir,
+        use_index_cache=use_index_cache,
+        io_concurrency=io_concurrency,
+        use_git_index=use_git_index,
+        low_memory=low_memory,
+        parse_workers=parse_workers,
+        parse_timeout=parse_timeout,
+        file_limits=file_limits,
+        file_cache_dir=file_cache_dir,
+        file_cache_max_size=file_cache_max_size,
+        search_roots=search_roots,
+        shard_index_dir=shard_index_dir,
+        project_path=project_path,
+    )
+
+    result_cache = (
+        ResultCache(
+            index_cache_dir,
+            logger,
+            use_git_index,
+            search_roots,
+            skip_generated=skip_generated,
+            max_file_size=max_file_size,
+            low_memory=low_memory,
+            shard_index_dir=shard_index_dir,
+        )
+        if use_result_cache
+        else None
+    )
+
+    # Blocks are written out as soon as they are extracted
+    output_path = Path(output_file)
+    try:
+        writer = OutputWriter(output_path, output_format, compression, chunk_size)
+    except ValueError as e:
+        logger.error(e)
+        return
+
+    blocks = iter_blocks(
+        parser,
+        target_names,
+        search_directories,
+        language,
+        logger,
+        subclasses=subclasses,
+        overrides=overrides,
+        first_match=first_match,
+        result_cache=result_cache,
+    )
+    if collapse_duplicate_blocks:
+        blocks = collapse_duplicates(blocks)
+    if rank or top_k or budget:
+        # Every candidate must be known before the first block is written
+        ranker = BlockRanker(search_directories, top_k, budget)
+        blocks = ranker.rank(list(blocks))
+
+    try:
+        for block in blocks:
+            writer.write(block)
+        output_paths = writer.close()
+        logger.info(f"Relevant code extracted to {', '.join(output_paths)}")
+    except OSError as e:
+        writer.abort()
+        logger.error(f"Error writing to output file {output_path}: {e}")
+    file_limits.report.log(logger)
 
-    parser = ParserFactory.get_parser(language)
 
+def iter_blocks(
+    parser,
+    target_names,
+    search_directories,
+    language,
+    logger,
+    subclasses=None,
+    overrides=None,
+    first_match=False,
+    result_cache=None,
+):
+    """
+    Yield the blocks extracted for `target_names` in output order, each class
+    only once, followed by the blocks of the `subclasses` and `overrides`
+    reverse lookups.
+    """
+    visited_classes = set()
     # Extract the requested classes or functions
     for target_name in target_names:
-        found = False
-        logger.info(f"Searching for '{target_name}'...")
-        for file_path, code_snippet, extra_info in parser.find_definitions(
-            target_name, search_directories
-        ):
-            if file_path is None:
-                continue  # Target not found
-            found = True
-            if extra_info == "class":
-                # Target is a class
-                logger.debug(f"Found class '{target_name}' in {file_path}")
-                output_content.append(f"File: {file_path}\n\n{code_snippet}\n")
-                visited_classes.add(target_name)
-                # Get the inheritance chain
-                inheritance_chain = parser.find_inheritance_chain(
-                    target_name, search_directories
+        blocks = None
+        if result_cache:
+            cache_key = result_cache.get_key(
+                target_name, search_directories, language, first_match
+            )
+            blocks = result_cache.get(cache_key)
+            if blocks is not None:
+                logger.info(f"Using cached result for '{target_name}'.")
+        if blocks is None:
+            unresolved = set()
+            blocks = extract_target(
+                parser, target_name, search_directories, first_match, logger, unresolved
+            )
+            if result_cache:
+                blocks = [load_source(parser, block) for block in blocks]
+                # Adding a missing class wouldn't invalidate the entry, builtins
+                # and the standard library are never defined in the searched files
+                if blocks and all(
+                    is_standard_name(name, file_path) for name, file_path in unresolved
+                ):
+                    result_cache.put(cache_key, blocks)
+        for block in blocks:
+            if block["class_name"]:
+                # Classes of the same name defined in several places all count
+                key = (block["file_path"], block["qualname"], block["start_line"])
+                if key in visited_classes:
+                    continue
+                visited_classes.add(key)
+            yield load_source(parser, block)
+
+    # Reverse lookups are answered from an index built in a single pass
+    if subclasses or overrides:
+        index = parser.build_index(search_directories)
+        if index is not None:
+            for base_name in subclasses or []:
+                logger.info(f"Searching for subclasses of '{base_name}'...")
+                records = index.find_subclasses(base_name)
+                if not records:
+                    logger.warning(f"No subclasses of '{base_name}' found.")
+                for record in records:
+                    yield make_block(record, parser.get_record_source(record))
+            for method_name in overrides or []:
+                logger.info(f"Searching for overrides of '{method_name}'...")
+                records = index.find_overrides(method_name)
+                if not records:
+                    logger.warning(f"No class defines a method '{method_name}'.")
+                for record in records:
+                    yield make_block(record, parser.get_record_source(record))
+
+
+def extract_target(
+    parser, target_name, search_directories, first_match, logger, unresolved=None
+):
+    """
+    Yield the blocks of code extracted for a single target: its definitions
+    and the inheritance chain of the classes involved. The classes that
+    could not be found are added to `unresolved` as `(name, file_path)`, the
+    file using the name, if any.
+    """
+    visited_classes = set()
+    found = False
+    logger.info(f"Searching for '{target_name}'...")
+    definitions = parser.find_definition_records(target_name, search_directories)
+    if first_match:
+        definitions = first_definition(
+            definitions, target_name, search_directories, logger
+        )
+    for record, code_snippet in definitions:
+        found = True
+        file_path = record["file_path"]
+        if record["kind"] == "class":
+            # Target is a class
+            logger.debug(f"Found class '{target_name}' in {file_path}")
+            yield make_block(record, code_snippet, class_name=target_name)
+            visited_classes.add(target_name)
+            # Get the inheritance chain
+            yield from get_inheritance_blocks(
+                parser, target_name, search_directories, visited_classes, unresolved
+            )
+        else:
+            # Target is a function
+            logger.debug(f"Found function '{target_name}' in {file_path}")
+            if record["class_hierarchy"]:
+                # Function is inside a class
+                class_name = record["class_hierarchy"][-1]
+                if class_name not in visited_classes:
+                    logger.debug(f"Processing class '{class_name}'")
+                    # Get the class definition and inheritance chain
+                    yield from get_inheritance_blocks(
+                        parser,
+                        class_name,
+                        search_directories,
+                        visited_classes,
+                        unresolved,
+                        depth=1,
+                    )
+            # Include the function code
+            yield make_block(record, code_snippet)
+
+    if not found:
+        logger.warning(f"'{target_name}' not found in the provided directories.")
+
+
+def get_inheritance_blocks(
+    parser, class_name, search_directories, visited_classes, unresolved=None, depth=0
+):
+    blocks = []
+    inheritance_chain = parser.find_inheritance_records(class_name, search_directories)
+    if unresolved is not None:
+        found = {record["name"] for record, _, _ in inheritance_chain}
+        if short_name(class_name) not in found:
+            unresolved.add((class_name, None))
+        for record, _, _ in inheritance_chain:
+            unresolved.update(
+                (base, record["file_path"])
+                for base in get_base_names(record)
+                if short_name(base) not in found
+            )
+    for record, class_source, inheritance_depth in inheritance_chain:
+        if record["name"] not in visited_classes:
+            blocks.append(
+                make_block(
+                    record,
+                    class_source,
+                    depth=depth + inheritance_depth,
+                    class_name=record["name"],
                 )
-                for class_file_path, class_source in inheritance_chain:
-                    class_definition_line = class_source.split("\n")[0]
-                    class_name_part = class_definition_line.split("(")[0].split(" ")[
-                        1
-                    ]  # Extract class name from definition
-                    if class_name_part not in visited_classes:
-                        output_content.append(
-                            f"File: {class_file_path}\n\n{class_source}\n"
-                        )
-                        visited_classes.add(class_name_part)
-            else:
-                # Target is a function
-                code_snippet, class_hierarchy = code_snippet, extra_info
-                logger.debug(f"Found function '{target_name}' in {file_path}")
-                if class_hierarchy:
-                    # Function is inside a class
-                    class_name = class_hierarchy[-1]
-                    if class_name not in visited_classes:
-                        logger.debug(f"Processing class '{class_name}'")
-                        # Get the class definition and inheritance chain
-                        inheritance_chain = parser.find_inheritance_chain(
-                            class_name, search_directories
-                        )
-                        for class_file_path, class_source in inheritance_chain:
-                            class_definition_line = class_source.split("\n")[0]
-                            class_name_part = class_definition_line.split("(")[0].split(
-                                " "
-                            )[1]  # Extract class name from definition
-                            if class_name_part not in visited_classes:
-                                output_content.append(
-                                    f"File: {class_file_path}\n\n{class_source}\n"
-                                )
-                                visited_classes.add(class_name_part)
-                    # Include the function code
-                    output_content.append(f"File: {file_path}\n\n{code_snippet}\n")
-                else:
-                    # Function is not inside a class
-                    output_content.append(f"File: {file_path}\n\n{code_snippet}\n")
+            )
+            visited_classes.add(record["name"])
+    return blocks
 
-        if not found:
-            logger.warning(f"'{target_name}' not found in the provided directories.")
 
-    # Write to output file
-    output_path = Path(output_file)
+def is_standard_name(name, file_path=None):
+    """
+    Whether `name`, as written in `file_path`, is a builtin or comes from a
+    module of the standard library imported there, e.g. `ABC` or `enum.Enum`.
+    """
+    head = name.split(".", 1)[0]
+    if "." not in name and hasattr(builtins, name):
+        return True
+    if file_path is None:
+        return False
+    module = get_imported_modules(file_path).get(head)
+    stdlib_modules = getattr(sys, "stdlib_module_names", ())  # Python 3.10+
+    return module is not None and module.split(".", 1)[0] in stdlib_modules
+
+
+def get_imported_modules(file_path):
+    """Map the names bound by the imports of a Python file to their module."""
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            for line in output_content:
-                f.write(f"{line}\n")
-        logger.info(f"Relevant code extracted to {output_path}")
-    except Exception as e:
-        logger.error(f"Error writing to output file {output_path}: {e}")
+        with open(file_path, "rb") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return {}
+    modules = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    modules[alias.asname] = alias.name
+                else:
+                    head = alias.name.split(".", 1)[0]
+                    modules[head] = head
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                modules[alias.asname or alias.name] = node.module
+    return modules
 
 
-def main():
+def make_block(record, source, depth=0, class_name=None):
+    """
+    Describe a block of extracted code. `depth` is the number of inheritance
+    steps between the block and the requested target. Without `source`, the
+    record is kept so the source can be loaded when the block is written.
+    """
+    block = {
+        "file_path": record["file_path"],
+        "qualname": record["qualname"],
+        "kind": record["kind"],
+        "start_line": record["lineno"],
+        "end_line": record["end_lineno"],
+        "depth": depth,
+        "source": source,
+        "class_name": class_name,
+    }
+    if source is None:
+        block["record"] = record
+    return block
+
+
+def load_source(parser, block):
+    """Read the source of a block extracted in low-memory mode."""
+    record = block.pop("record", None)
+    if record is not None:
+        block["source"] = parser.get_record_source(record)
+    return block
+
+
+def first_definition(definitions, target_name, search_directories, logger):
+    """
+    Yield only the first definition found and stop the underlying search,
+    reporting the search roots that were never reached.
+    """
+    for record, code_snippet in definitions:
+        yield record, code_snippet
+        definitions.close()
+        file_path = record["file_path"]
+        skipped_roots = search_directories[
+            get_search_root_index(file_path, search_directories) + 1 :
+        ]
+        if skipped_roots:
+            logger.info(
+                f"'{target_name}' resolved in {file_path}, skipped search roots: "
+                f"{', '.join(skipped_roots)}"
+            )
+        return
+
+
+def cache_main(argv):
+    """`ccprompt cache stats|clear`: inspect or empty the file cache."""
+    parser = argparse.ArgumentParser(
+        prog="ccprompt cache",
+        description="Show statistics of the file cache or clear it.",
+    )
+    parser.add_argument("action", choices=["stats", "clear"])
+    parser.add_argument(
+        "--project_path",
+        type=str,
+        default=os.getcwd(),
+        help="Project whose cache is used (default: current directory).",
+    )
+    parser.add_argument(
+        "--file_cache_dir",
+        type=str,
+        help="Cache directory (default: __ccprompt_cache__ in the project).",
+    )
+    args = parser.parse_args(argv)
+
+    file_cache = FileRecordCache(
+        args.file_cache_dir or default_file_cache_dir(args.project_path)
+    )
+    if args.action == "clear":
+        removed = file_cache.clear()
+        print(f"Removed {removed} entries from {file_cache.cache_dir}")
+        return
+    stats = file_cache.get_stats()
+    print(f"Cache directory: {stats['cache_dir']}")
+    print(f"Entries: {stats['entries']}")
+    print(
+        f"Size: {stats['size'] / 2**20:.2f} MiB of {stats['max_size'] / 2**20:.2f} MiB"
+    )
+
+
+def index_main(argv):
+    """`ccprompt index build|merge`: maintain a sharded definition index."""
+    parser = argparse.ArgumentParser(
+        prog="ccprompt index",
+        description="Build a sharded definition index, or merge indexes built "
+        "separately, e.g. on several machines.",
+    )
+    subparsers = parser.add_subparsers(dest="action", required=True)
+    build_parser = subparsers.add_parser(
+        "build", help="Index directories into shards, one per package."
+    )
+    build_parser.add_argument(
+        "directories",
+        nargs="*",
+        help="Directories to index (default: the search roots, else the project "
+        "and its venv).",
+    )
+    build_parser.add_argument(
+        "--project_path",
+        type=str,
+        help="Project whose index is built (default: that of the configuration "
+        "file, else the current directory).",
+    )
+    build_parser.add_argument(
+        "--index_dir",
+        type=str,
+        help="Index directory (default: __ccprompt_index__ in the project).",
+    )
+    build_parser.add_argument(
+        "--shard_depth",
+        type=int,
+        default=1,
+        help="Depth of the shard directories below each indexed directory.",
+    )
+    build_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes building shards.",
+    )
+    build_parser.add_argument(
+        "--config",
+        type=str,
+        default="ccprompt_config.json",
+        help="Configuration file whose search roots, venv, git index and file "
+        "limits options select the files indexed, if it exists.",
+    )
+    build_parser.add_argument(
+        "--search_roots",
+        type=str,
+        nargs="+",
+        help="Override the search roots of the configuration file.",
+    )
+    build_parser.add_argument(
+        "--exclude_venv",
+        action="store_true",
+        help="Don't index the virtual environment site-packages directory.",
+    )
+    build_parser.add_argument(
+        "--git_index",
+        action="store_true",
+        help="List the files of git repositories from the git index.",
+    )
+    build_parser.add_argument(
+        "--max_file_size",
+        "--max-file-size",
+        type=int,
+        help="Skip source files larger than this many bytes.",
+    )
+    build_parser.add_argument(
+        "--parse_time_budget",
+        "--parse-time-budget",
+        type=float,
+        help="Stop parsing a file after this many seconds and skip it.",
+    )
+    build_parser.add_argument(
+        "--skip_generated",
+        "--skip-generated",
+        action="store_true",
+        help="Skip minified files and files marked as generated.",
+    )
+    merge_parser = subparsers.add_parser(
+        "merge", help="Merge indexes into one, later ones taking precedence."
+    )
+    merge_parser.add_argument("output_dir", help="Directory of the merged index.")
+    merge_parser.add_argument("input_dirs", nargs="+", help="Indexes to merge.")
+    args = parser.parse_args(argv)
+
+    if args.action == "merge":
+        try:
+            count = merge_indexes(args.output_dir, args.input_dirs)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error merging indexes: {e}")
+            sys.exit(1)
+        print(f"Merged {count} shards into {args.output_dir}")
+        return
+    # Select the files an extraction with the same configuration would search
+    config_args = get_argument_parser().parse_args([])
+    vars(config_args).update(vars(args))
+    config = Config(args.config, config_args, extraction=False)
+    project_path = config.project_path or os.getcwd()
+    search_roots = order_search_roots(config.search_roots)
+    file_limits = FileLimits(
+        config.max_file_size, config.parse_time_budget, config.skip_generated
+    )
+    index_dir = args.index_dir or default_index_dir(project_path)
+    directories = args.directories or [search_root.path for search_root in search_roots]
+    if not directories:
+        directories = [project_path]
+        if config.venv_site_packages_path:
+            directories.append(config.venv_site_packages_path)
+    count = build_index(
+        index_dir,
+        directories,
+        args.shard_depth,
+        args.workers,
+        root=project_path,
+        use_git_index=config.use_git_index,
+        file_limits=file_limits,
+        search_roots=search_roots,
+    )
+    for file_path, reason, _ in file_limits.report.get_entries():
+        print(f"Skipped {file_path}: {reason}")
+    print(f"Indexed {count} shards into {index_dir}")
+
+
+def get_argument_parser():
+    """Options of an extraction, also the defaults `Config` reads."""
     parser = argparse.ArgumentParser(
         description="Extract code context for AI prompts based on a function or class name."
     )
@@ -133,6 +614,14 @@ def main():
         nargs="+",
         help="Override the function or class names from the configuration file.",
     )
+    parser.add_argument(
+        "--search_roots",
+        type=str,
+        nargs="+",
+        help="Search these directories, in order, instead of the project and "
+        "site-packages; see `search_roots` in the configuration file for "
+        "priorities and include/exclude globs.",
+    )
     parser.add_argument(
         "--exclude_venv",
         action="store_true",
@@ -143,13 +632,163 @@ def main():
         type=str,
         help="Specify the output file for the extracted code.",
     )
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=OUTPUT_FORMATS,
+        help="Format of the output file.",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        choices=COMPRESSIONS,
+        help="Compress the output file(s).",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        help="Split the output into files of at most this many bytes (uncompressed).",
+    )
     parser.add_argument(
         "--language",
         type=str,
-        choices=["python", "javascript"],
-        help="Specify the programming language.",
+        choices=["python", "javascript", "auto"],
+        help="Specify the programming language, 'auto' picks the parser of each file "
+        "from its extension.",
         default="python",
     )
+    parser.add_argument(
+        "--subclasses",
+        type=str,
+        nargs="+",
+        help="Also extract every class inheriting from these base classes.",
+    )
+    parser.add_argument(
+        "--overrides",
+        type=str,
+        nargs="+",
+        help="Also extract every class-level definition of these methods.",
+    )
+    parser.add_argument(
+        "--index_cache_dir",
+        type=str,
+        help="Directory of the shared site-packages index cache (default: ~/.cache/ccprompt).",
+    )
+    parser.add_argument(
+        "--no_index_cache",
+        action="store_true",
+        help="Index site-packages from scratch instead of using the shared index cache.",
+    )
+    parser.add_argument(
+        "--io_concurrency",
+        "--io-concurrency",
+        type=int,
+        help="Number of Python files read concurrently, useful on network filesystems.",
+    )
+    parser.add_argument(
+        "--first_match",
+        "--first-match",
+        action="store_true",
+        help="Keep only the first definition of each target, searching the project "
+        "before site-packages and stopping as soon as it is found.",
+    )
+    parser.add_argument(
+        "--result_cache",
+        action="store_true",
+        help="Reuse the extracted code of targets whose source files did not change.",
+    )
+    parser.add_argument(
+        "--git_index",
+        action="store_true",
+        help="List the files of git repositories from the git index instead of "
+        "walking the directories; untracked files are ignored.",
+    )
+    parser.add_argument(
+        "--low_memory",
+        "--low-memory",
+        action="store_true",
+        help="Parse one file at a time and keep only the offsets of definitions, "
+        "reading their source back from disk when writing the output.",
+    )
+    parser.add_argument(
+        "--parse_workers",
+        "--parse-workers",
+        type=int,
+        help="Number of worker processes parsing JavaScript files.",
+    )
+    parser.add_argument(
+        "--parse_timeout",
+        "--parse-timeout",
+        type=float,
+        help="Seconds after which a worker parsing a single file is given up on "
+        "and the file skipped (default: 30).",
+    )
+    parser.add_argument(
+        "--max_file_size",
+        "--max-file-size",
+        type=int,
+        help="Skip source files larger than this many bytes.",
+    )
+    parser.add_argument(
+        "--parse_time_budget",
+        "--parse-time-budget",
+        type=float,
+        help="Stop parsing a file after this many seconds and skip it.",
+    )
+    parser.add_argument(
+        "--skip_generated",
+        "--skip-generated",
+        action="store_true",
+        help="Skip minified files and files marked as generated (e.g. protobuf stubs).",
+    )
+    parser.add_argument(
+        "--file_cache",
+        action="store_true",
+        help="Keep the definitions found in each Python file across runs, see "
+        "`ccprompt cache stats|clear`.",
+    )
+    parser.add_argument(
+        "--file_cache_dir",
+        type=str,
+        help="Directory of the file cache (default: __ccprompt_cache__ in the project).",
+    )
+    parser.add_argument(
+        "--file_cache_max_size",
+        type=int,
+        help="Size in bytes above which the least recently used cache entries are "
+        "evicted (default: 64 MiB).",
+    )
+    parser.add_argument(
+        "--shard_index_dir",
+        type=str,
+        help="Answer lookups from the sharded index built there by "
+        "`ccprompt index build` instead of reading the search directories.",
+    )
+    parser.add_argument(
+        "--collapse_duplicates",
+        "--collapse-duplicates",
+        action="store_true",
+        help="Write identical definitions found in several files (vendored copies, "
+        "several venvs) once, listing every path.",
+    )
+    parser.add_argument(
+        "--rank",
+        action="store_true",
+        help="Write the most relevant blocks first: closest in the inheritance chain, "
+        "from the project rather than site-packages, most referenced by the targets.",
+    )
+    parser.add_argument(
+        "--top_k",
+        "--top-k",
+        type=int,
+        help="Keep only this many blocks, the most relevant ones (implies --rank).",
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        help="Keep the most relevant blocks whose sources fit in this many "
+        "characters (implies --rank).",
+    )
     parser.add_argument(
         "--log_level",
         type=str,
@@ -157,6 +796,16 @@ def main():
         help="Set the logging level.",
         default="WARNING",
     )
+    return parser
+
+
+def main():
+    if sys.argv[1:2] == ["cache"]:
+        return cache_main(sys.argv[2:])
+    if sys.argv[1:2] == ["index"]:
+        return index_main(sys.argv[2:])
+
+    parser = get_argument_parser()
     args = parser.parse_args()
 
     # Set up logging
@@ -175,6 +824,32 @@ def main():
         config.output_file,
         config.language,
         logger=logger,
+        subclasses=config.subclasses,
+        overrides=config.overrides,
+        index_cache_dir=config.index_cache_dir,
+        use_index_cache=config.use_index_cache,
+        io_concurrency=config.io_concurrency,
+        first_match=config.first_match,
+        use_result_cache=config.use_result_cache,
+        use_git_index=config.use_git_index,
+        output_format=config.output_format,
+        compression=config.compression,
+        chunk_size=config.chunk_size,
+        low_memory=config.low_memory,
+        parse_workers=config.parse_workers,
+        parse_timeout=config.parse_timeout,
+        max_file_size=config.max_file_size,
+        parse_time_budget=config.parse_time_budget,
+        skip_generated=config.skip_generated,
+        use_file_cache=config.use_file_cache,
+        file_cache_dir=config.file_cache_dir,
+        file_cache_max_size=config.file_cache_max_size,
+        rank=config.rank,
+        top_k=config.top_k,
+        budget=config.budget,
+        search_roots=config.search_roots,
+        collapse_duplicate_blocks=config.collapse_duplicates,
+        shard_index_dir=config.shard_index_dir,
     )
 
 
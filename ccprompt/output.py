@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import gzip
+import json
+import os
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None  # Python < 3.14
+
+OUTPUT_FORMATS = ("text", "json", "jsonl", "markdown")
+COMPRESSIONS = ("gzip", "zstd")
+
+# Fields of a block that are written to the structured formats
+BLOCK_FIELDS = (
+    "file_path",
+    "qualname",
+    "kind",
+    "start_line",
+    "end_line",
+    "depth",
+    "source",
+)
+
+MARKDOWN_LANGUAGES = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "jsx",
+    ".ts": "typescript",
+    ".tsx": "tsx",
+}
+
+
+class OutputWriter:
+    """
+    Stream extracted blocks to the output file, one block at a time.
+
+    With `chunk_size`, a new file is started whenever the current one would
+    grow past `chunk_size` bytes, e.g. `extracted_code.001.jsonl`,
+    `extracted_code.002.jsonl`, ... Every chunk is valid on its own, so they
+    can be consumed in parallel.
+    """
+
+    def __init__(
+        self, output_path, output_format="text", compression=None, chunk_size=None
+    ):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        if compression not in (None, *COMPRESSIONS):
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression == "zstd" and zstd is None:
+            raise ValueError("zstd compression requires Python 3.14 or later.")
+        self.output_path = str(output_path)
+        self.output_format = output_format
+        self.compression = compression
+        self.chunk_size = chunk_size
+        self.output_paths = []
+        self.file = None
+        self.chunk_bytes = 0
+        self.chunk_blocks = 0
+
+    def write(self, block):
+        data = self.serialize(block)
+        size = len(data.encode("utf-8"))
+        if self.file is None or (
+            self.chunk_size
+            and self.chunk_blocks
+            and self.chunk_bytes + size > self.chunk_size
+        ):
+            self.open_chunk()
+        if self.output_format == "json" and self.chunk_blocks:
+            data = ",\n" + data
+        self.file.write(data)
+        self.chunk_bytes += size
+        self.chunk_blocks += 1
+
+    def close(self):
+        """Finish the last file and return the paths of all written files."""
+        if self.file is None:
+            self.open_chunk()  # Always leave an output file behind
+        self.close_chunk()
+        return self.output_paths
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def open_chunk(self):
+        if self.file is not None:
+            self.close_chunk()
+        path = self.get_chunk_path(len(self.output_paths) + 1)
+        if self.compression == "gzip":
+            self.file = gzip.open(path, "wt", encoding="utf-8")
+        elif self.compression == "zstd":
+            self.file = zstd.open(path, "wt", encoding="utf-8")
+        else:
+            self.file = open(path, "w", encoding="utf-8")
+        self.output_paths.append(path)
+        self.chunk_bytes = 0
+        self.chunk_blocks = 0
+        if self.output_format == "json":
+            self.file.write("[\n")
+
+    def close_chunk(self):
+        if self.output_format == "json":
+            self.file.write("\n]\n")
+        self.file.close()
+        self.file = None
+
+    def get_chunk_path(self, number):
+        path = self.output_path
+        if self.chunk_size:
+            stem, extension = os.path.splitext(path)
+            path = f"{stem}.{number:03d}{extension}"
+        if self.compression == "gzip":
+            path += ".gz"
+        elif self.compression == "zstd":
+            path += ".zst"
+        return path
+
+    def serialize(self, block):
+        return serialize_block(block, self.output_format)
+
+
+def serialize_block(block, output_format):
+    """Return a block as written to an output file of `output_format`."""
+    duplicate_paths = block.get("duplicate_paths")
+    if output_format == "text":
+        also_in = ""
+        if duplicate_paths:
+            also_in = f"Also in: {', '.join(duplicate_paths)}\n"
+        return f"File: {block['file_path']}\n{also_in}\n{block['source']}\n\n"
+    if output_format == "markdown":
+        extension = os.path.splitext(block["file_path"])[1]
+        also_in = ""
+        if duplicate_paths:
+            paths = ", ".join(f"`{path}`" for path in duplicate_paths)
+            also_in = f"Also in {paths}\n\n"
+        return (
+            f"## {block['qualname']}\n\n"
+            f"`{block['file_path']}` lines {block['start_line']}-{block['end_line']}"
+            f" ({block['kind']}, depth {block['depth']})\n\n{also_in}"
+            f"```{MARKDOWN_LANGUAGES.get(extension, '')}\n{block['source']}\n```\n\n"
+        )
+    fields = {field: block[field] for field in BLOCK_FIELDS}
+    if duplicate_paths:
+        fields["duplicate_paths"] = duplicate_paths
+    data = json.dumps(fields)
+    if output_format == "jsonl":
+        return data + "\n"
+    return data
+
+
+def collapse_duplicates(blocks):
+    """
+    Merge the blocks of identical definitions found in several files into the
+    first one, which lists the other files in `duplicate_paths`.
+    """
+    collapsed = {}
+    for block in blocks:
+        key = (block["qualname"], block["kind"], block["source"])
+        first = collapsed.get(key)
+        if first is None:
+            collapsed[key] = dict(block)
+        elif block["file_path"] != first["file_path"]:
+            first.setdefault("duplicate_paths", []).append(block["file_path"])
+    return list(collapsed.values())
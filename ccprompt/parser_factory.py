@@ -6,20 +6,96 @@
 # modify it under the terms of the MIT License; see LICENSE file details.
 
 import sys
-from .parsers.python_parser import PythonParser
+from .parsers.python_parser import FileHandler, PythonParser
 from .parsers.javascript_parser import JavaScriptParser
+from .parsers.esprima_adapter import EsprimaAdapter
+from .parsers.parse_pool import DEFAULT_PARSE_TIMEOUT, ParsePool
+from .parsers.multi_language_parser import JAVASCRIPT_EXTENSIONS, MultiLanguageParser
+from .parsers.shard_index import ShardedIndex
 
 
 class ParserFactory:
     @staticmethod
-    def get_parser(language):
-        if language == "python":
-            return PythonParser()
+    def get_parser(
+        language,
+        logger=None,
+        index_cache_dir=None,
+        use_index_cache=False,
+        io_concurrency=1,
+        use_git_index=False,
+        low_memory=False,
+        parse_workers=1,
+        parse_timeout=DEFAULT_PARSE_TIMEOUT,
+        file_limits=None,
+        file_cache_dir=None,
+        file_cache_max_size=None,
+        search_roots=None,
+        shard_index_dir=None,
+        project_path=None,
+    ):
+        if shard_index_dir and language != "python":
+            print(
+                "The sharded index only covers Python files, it is not used with "
+                f"--language {language}."
+            )
+        parse_pool = None
+        if parse_workers > 1:
+            parse_pool = ParsePool(parse_workers, parse_timeout, logger)
+        if language in ("python", "auto"):
+            python_parser = PythonParser(
+                logger=logger,
+                index_cache_dir=index_cache_dir,
+                use_index_cache=use_index_cache,
+                io_concurrency=io_concurrency,
+                use_git_index=use_git_index,
+                low_memory=low_memory,
+                file_limits=file_limits,
+                file_cache_dir=file_cache_dir,
+                file_cache_max_size=file_cache_max_size,
+                search_roots=search_roots,
+            )
+            if language == "python":
+                if shard_index_dir:
+                    return MultiLanguageParser(
+                        {".py": python_parser},
+                        python_parser.file_handler,
+                        logger,
+                        file_limits=file_limits,
+                        shard_index=ShardedIndex(
+                            shard_index_dir,
+                            logger,
+                            project_path,
+                            python_parser.file_handler,
+                            python_parser.definition_finder,
+                        ),
+                    )
+                return python_parser
+            parsers = {".py": python_parser}
+            if EsprimaAdapter.available:
+                javascript_parser = JavaScriptParser(file_limits)
+                for extension in JAVASCRIPT_EXTENSIONS:
+                    parsers[extension] = javascript_parser
+            else:
+                print(
+                    "The 'esprima' library is not installed, JavaScript files are skipped. "
+                    "Install it using 'pip install esprima'."
+                )
+            return MultiLanguageParser(
+                parsers, python_parser.file_handler, logger, parse_pool, file_limits
+            )
         elif language == "javascript":
-            try:
-                return JavaScriptParser()
-            except ImportError as e:
-                print(e)
+            if not EsprimaAdapter.available:
+                print(
+                    "The 'esprima' library is required for JavaScript/TypeScript parsing. Please install it using 'pip install esprima'."
+                )
                 sys.exit(1)
+            javascript_parser = JavaScriptParser(file_limits)
+            return MultiLanguageParser(
+                {extension: javascript_parser for extension in JAVASCRIPT_EXTENSIONS},
+                FileHandler(io_concurrency, use_git_index, file_limits, search_roots),
+                logger,
+                parse_pool,
+                file_limits,
+            )
         else:
             raise ValueError(f"Unsupported language: {language}")
@@ -9,6 +9,8 @@ from abc import ABC, abstractmethod
 
 
 class BaseParser(ABC):
+    logger = None
+
     @abstractmethod
     def find_definitions(self, name, directories):
         pass
@@ -16,3 +18,133 @@ class BaseParser(ABC):
     @abstractmethod
     def find_inheritance_chain(self, class_name, directories):
         pass
+
+    def build_index(self, directories):
+        """
+        Return the SymbolIndex of the definitions in `directories`, or None
+        if the parser doesn't build one.
+        """
+        message = (
+            f"Subclass and override lookups are not supported by {type(self).__name__}."
+        )
+        if self.logger:
+            self.logger.error(message)
+        else:
+            print(f"Error: {message}")
+        return None
+
+
+class RecordParser(BaseParser):
+    """
+    Parser answering lookups with definition records, the dicts stored in a
+    SymbolIndex. Subclasses provide `find_definition_records`,
+    `find_class_record` and `get_record_source`; the tuple based BaseParser
+    API is derived from them.
+    """
+
+    @abstractmethod
+    def find_definition_records(self, name, directories):
+        """Yield `(record, source)` for every definition named `name`."""
+
+    @abstractmethod
+    def find_class_record(self, class_name, directories):
+        """Return `(record, source)` of the first class named `class_name`, or None."""
+
+    @abstractmethod
+    def get_record_source(self, record):
+        pass
+
+    def find_definitions(self, name, directories):
+        for record, source in self.find_definition_records(name, directories):
+            if record["kind"] == "class":
+                yield record["file_path"], source, "class"
+            else:
+                yield (
+                    record["file_path"],
+                    source,
+                    record["class_hierarchy"] or "function",
+                )
+
+    def find_inheritance_chain(self, class_name, directories):
+        return [
+            (record["file_path"], source)
+            for record, source, _ in self.find_inheritance_records(
+                class_name, directories
+            )
+        ]
+
+    def find_class_records(self, class_names, directories):
+        """
+        Return `{class_name: (record, source) or None}` for `class_names`.
+        Parsers that can answer several lookups in one pass override this.
+        """
+        return {
+            class_name: self.find_class_record(class_name, directories)
+            for class_name in class_names
+        }
+
+    def find_inheritance_records(self, class_name, directories):
+        """
+        Return `(record, source, depth)` for `class_name` and every base class
+        and metaclass it inherits from, `depth` being the number of
+        inheritance steps from `class_name`.
+
+        The classes of each inheritance level are looked up together, then
+        the chain is walked depth first from the results.
+        """
+        results = self.resolve_inheritance_levels(class_name, directories)
+        inheritance_chain = []
+        classes_to_trace = [(class_name, 0)]
+        visited_classes = set()
+
+        while classes_to_trace:
+            current_class, depth = classes_to_trace.pop()
+            if current_class in visited_classes:
+                continue
+            visited_classes.add(current_class)
+
+            result = results.get(current_class)
+            if result:
+                record, class_source = result
+                inheritance_chain.append((record, class_source, depth))
+                for base_class in get_base_names(record):
+                    if base_class not in visited_classes:
+                        classes_to_trace.append((base_class, depth + 1))
+            else:
+                # Class definition not found
+                if self.logger:
+                    self.logger.warning(
+                        f"Class or metaclass '{current_class}' not found in provided directories."
+                    )
+                else:
+                    print(
+                        f"Warning: Class or metaclass '{current_class}' not found in provided directories."
+                    )
+        return inheritance_chain
+
+    def resolve_inheritance_levels(self, class_name, directories):
+        """
+        Look up `class_name` and its ancestors one inheritance level at a
+        time, all the bases of a level in a single `find_class_records` call.
+        """
+        results = {}
+        frontier = [class_name]
+        while frontier:
+            level_results = self.find_class_records(frontier, directories)
+            results.update(level_results)
+            next_frontier = {}  # Ordered set
+            for result in level_results.values():
+                if result:
+                    for base_class in get_base_names(result[0]):
+                        if base_class not in results:
+                            next_frontier[base_class] = None
+            frontier = list(next_frontier)
+        return results
+
+
+def get_base_names(record):
+    """Return the bases of a class record followed by its metaclass."""
+    base_classes = list(record["bases"])
+    if record["metaclass"]:
+        base_classes.append(record["metaclass"])
+    return base_classes
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import csv
+import hashlib
+import json
+import os
+import sys
+import tempfile
+
+# Bump whenever the layout of the stored definition records changes
+INDEX_FORMAT_VERSION = 4
+
+
+def default_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "ccprompt")
+
+
+class Distribution:
+    """An installed distribution, described by its `*.dist-info` directory."""
+
+    def __init__(self, site_packages_path, dist_info_path):
+        self.site_packages_path = site_packages_path
+        self.dist_info_path = dist_info_path
+        self.name, self.version = self.read_metadata()
+        self.file_sizes = {}  # Sizes listed in RECORD, by relative path
+        self.python_files = self.read_python_files()
+
+    def read_metadata(self):
+        # Fall back to the directory name, `<name>-<version>.dist-info`
+        stem = os.path.basename(self.dist_info_path)[: -len(".dist-info")]
+        name, _, version = stem.partition("-")
+        try:
+            with open(
+                os.path.join(self.dist_info_path, "METADATA"), "r", encoding="utf-8"
+            ) as f:
+                for line in f:
+                    if not line.strip():
+                        break  # End of the headers
+                    key, _, value = line.partition(":")
+                    if key == "Name":
+                        name = value.strip()
+                    elif key == "Version":
+                        version = value.strip()
+        except (IOError, OSError, UnicodeDecodeError):
+            pass
+        return name, version
+
+    def read_python_files(self):
+        """
+        Return the sorted `(relative path, hash)` pairs of the Python modules
+        listed in RECORD. Entries outside of site-packages are ignored.
+        """
+        python_files = []
+        try:
+            with open(
+                os.path.join(self.dist_info_path, "RECORD"),
+                "r",
+                encoding="utf-8",
+                newline="",
+            ) as f:
+                for row in csv.reader(f):
+                    if not row or not row[0].endswith(".py"):
+                        continue
+                    if row[0].startswith(("..", "/")):
+                        continue
+                    python_files.append((row[0], row[1] if len(row) > 1 else ""))
+                    if len(row) > 2 and row[2].isdigit():
+                        self.file_sizes[row[0]] = int(row[2])
+        except (IOError, OSError, UnicodeDecodeError):
+            return []
+        return sorted(python_files)
+
+    def cache_key(self):
+        """
+        Content address of the distribution's index: RECORD hashes every file
+        it installs, so identical installs on any machine share the same key.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{INDEX_FORMAT_VERSION}\n".encode())
+        digest.update(f"{sys.version_info[0]}.{sys.version_info[1]}\n".encode())
+        digest.update(f"{self.name}\n{self.version}\n".encode())
+        for path, file_hash in self.python_files:
+            digest.update(f"{path},{file_hash}\n".encode())
+        return digest.hexdigest()
+
+    def find_changed_files(self):
+        """
+        Return the relative paths of the modules removed or modified since the
+        distribution was installed: a size that differs from RECORD, or an
+        mtime later than RECORD, which installers write last.
+        """
+        try:
+            installed = os.stat(os.path.join(self.dist_info_path, "RECORD")).st_mtime_ns
+        except OSError:
+            return [path for path, _ in self.python_files]
+        changed = []
+        for path, _ in self.python_files:
+            try:
+                stat = os.stat(os.path.join(self.site_packages_path, path))
+            except OSError:
+                changed.append(path)
+                continue
+            size = self.file_sizes.get(path)
+            if stat.st_mtime_ns > installed or (
+                size is not None and stat.st_size != size
+            ):
+                changed.append(path)
+        return changed
+
+    def absolute_paths(self):
+        return {
+            os.path.normpath(os.path.join(self.site_packages_path, path))
+            for path, _ in self.python_files
+        }
+
+
+class DistributionIndexCache:
+    """
+    Content-addressed store of per-distribution definition records.
+
+    Each installed distribution found in a site-packages directory is indexed
+    once and saved under `<cache_dir>/dists/<key>.json` with paths relative to
+    site-packages, so the entry can be reused by any project, venv or machine
+    that has the same distribution installed.
+    """
+
+    def __init__(self, cache_dir=None, logger=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.logger = logger
+
+    def find_distributions(self, directory):
+        try:
+            entries = sorted(os.listdir(directory))
+        except (IOError, OSError):
+            return []
+        distributions = []
+        for entry in entries:
+            if entry.endswith(".dist-info"):
+                distribution = Distribution(directory, os.path.join(directory, entry))
+                if distribution.python_files:
+                    distributions.append(distribution)
+        return distributions
+
+    def get_entry_path(self, key):
+        return os.path.join(self.cache_dir, "dists", key[:2], f"{key}.json")
+
+    def load_records(self, distribution, build_records):
+        """
+        Return the definition records of `distribution` with absolute paths,
+        calling `build_records(site_packages_path, relative_paths)` on a miss.
+
+        The modules changed since the distribution was installed are parsed
+        again with `build_records`, and keep a distribution with changed
+        modules out of the cache.
+        """
+        key = distribution.cache_key()
+        entry_path = self.get_entry_path(key)
+        records = self.read_entry(entry_path)
+        changed = distribution.find_changed_files()
+        if records is None:
+            self.log(
+                f"Indexing {distribution.name} {distribution.version} into {entry_path}"
+            )
+            records = build_records(
+                distribution.site_packages_path,
+                [path for path, _ in distribution.python_files],
+            )
+            if not changed:
+                self.write_entry(entry_path, distribution, records)
+        elif changed:
+            self.log(
+                f"{len(changed)} file(s) of {distribution.name} changed since it "
+                f"was installed, parsing them again"
+            )
+            changed_paths = set(changed)
+            records = [
+                record for record in records if record["file_path"] not in changed_paths
+            ]
+            records.extend(build_records(distribution.site_packages_path, changed))
+        for record in records:
+            record["file_path"] = os.path.join(
+                distribution.site_packages_path, record["file_path"]
+            )
+        return records
+
+    def read_entry(self, entry_path):
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                return json.load(f)["records"]
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+
+    def write_entry(self, entry_path, distribution, records):
+        entry = {
+            "name": distribution.name,
+            "version": distribution.version,
+            "records": records,
+        }
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            # Write to a temporary file first so concurrent runs never see a
+            # partially written entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, entry_path)
+        except (IOError, OSError) as e:
+            self.log(f"Could not write index cache entry {entry_path}: {e}")
+
+    def log(self, message):
+        if self.logger:
+            self.logger.debug(message)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import hashlib
+import os
+
+
+class DuplicateFiles:
+    """
+    Share the definition records of files found under several paths.
+
+    Site-packages, vendored copies and symlinked venvs often hold the same
+    module more than once. A path that links to a file parsed before (same
+    device and inode) gets its records without being read, and a file whose
+    content hashes like one parsed before gets its records without being
+    parsed. Shared records are copies pointing to each path.
+    """
+
+    def __init__(self):
+        self.inodes = {}  # Path -> (st_dev, st_ino) of files about to be parsed
+        self.inode_records = {}
+        self.content_records = {}
+
+    def link_files(self, file_paths, known_records):
+        """
+        Pass `file_paths` through, adding the records of the files linked to
+        a file parsed before to `known_records`, so they are not read.
+        """
+        for file_path in file_paths:
+            if file_path not in known_records:
+                records = self.find_linked(file_path)
+                if records is not None:
+                    known_records[file_path] = records
+            yield file_path
+
+    def find_linked(self, file_path):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None  # Reported when the file is read
+        inode = (stat.st_dev, stat.st_ino)
+        records = self.inode_records.get(inode)
+        if records is None:
+            self.inodes[file_path] = inode
+            return None
+        return relocate_records(records, file_path)
+
+    def parse(self, file_path, file_content, parse):
+        """Return `parse(file_path, file_content)` or the records of a copy."""
+        key = get_content_key(file_content)
+        records = self.get(key, file_path)
+        if records is None:
+            records = parse(file_path, file_content)
+            self.add(key, file_path, records)
+        return records
+
+    def get(self, key, file_path):
+        records = self.content_records.get(key)
+        if records is None:
+            return None
+        records = relocate_records(records, file_path)
+        self.add(key, file_path, records)
+        return records
+
+    def add(self, key, file_path, records):
+        self.content_records.setdefault(key, records)
+        inode = self.inodes.pop(file_path, None)
+        if inode is not None:
+            self.inode_records[inode] = records
+
+
+def get_content_key(file_content):
+    data = file_content.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def relocate_records(records, file_path):
+    if records and records[0]["file_path"] == file_path:
+        return records
+    return [dict(record, file_path=file_path) for record in records]
@@ -10,13 +10,28 @@ try:
 except ImportError:
     esprima = None
 
+from .file_limits import check_deadline
 from .js_parser_interface import JSParserInterface
 
 
 class EsprimaAdapter(JSParserInterface):
-    def parse(self, code):
+    available = esprima is not None
+
+    def parse(self, code, deadline=None, jsx=False):
+        """
+        Parse `code` as an ES module, which also accepts plain scripts in
+        tolerant mode. With `jsx`, JSX elements are allowed.
+        """
         if esprima is None:
             raise ImportError(
                 "The 'esprima' library is required for JavaScript/TypeScript parsing. Please install it using 'pip install esprima'."
             )
-        return esprima.parseScript(code, tolerant=True, range=True)
+        delegate = None
+        if deadline is not None:
+            # Called for every node, aborts the parse once past the deadline
+            def delegate(node, metadata):
+                check_deadline(deadline)
+
+        return esprima.parseModule(
+            code, {"jsx": jsx, "range": True, "tolerant": True}, delegate
+        )
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import threading
+import time
+
+# Header lines that code generators leave in their output
+GENERATED_MARKERS = (
+    "generated by the protocol buffer compiler",
+    "code generated by",
+    "@generated",
+    "auto-generated",
+    "autogenerated",
+    "do not edit",
+)
+# Only the beginning of a file is searched for markers
+GENERATED_HEADER_SIZE = 2048
+# Files with longer lines on average are considered minified
+MINIFIED_LINE_LENGTH = 250
+MINIFIED_MIN_SIZE = 4096
+
+
+class ParseBudgetExceeded(Exception):
+    pass
+
+
+class SkipReport:
+    """
+    Files skipped or failed during a run, with the reason and time spent.
+    A file met several times (one lookup per target) is listed once, with
+    the total time spent on it.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.RLock()  # Files may be read on a thread pool
+
+    def add(self, file_path, reason, elapsed=0.0):
+        with self.lock:
+            if file_path in self.entries:
+                elapsed += self.entries[file_path][1]
+            self.entries[file_path] = (reason, elapsed)
+
+    def extend(self, entries):
+        for file_path, reason, elapsed in entries:
+            self.add(file_path, reason, elapsed)
+
+    def get_entries(self):
+        """Return the entries as `(file_path, reason, elapsed)`."""
+        with self.lock:
+            return [
+                (file_path, reason, elapsed)
+                for file_path, (reason, elapsed) in self.entries.items()
+            ]
+
+    def pop_entries(self):
+        with self.lock:
+            entries = self.get_entries()
+            self.entries = {}
+        return entries
+
+    def log(self, logger):
+        if not self.entries:
+            return
+        lines = [f"Skipped {len(self.entries)} file(s):"]
+        for file_path, (reason, elapsed) in self.entries.items():
+            lines.append(f"  {file_path}: {reason} ({elapsed:.2f}s)")
+        logger.warning("\n".join(lines))
+
+
+class FileLimits:
+    """
+    Limits applied to every file before and while it is parsed.
+
+    Files larger than `max_file_size` bytes are skipped without being read.
+    Parsing a file is aborted once it took `parse_time_budget` seconds, and
+    with `skip_generated`, minified or generated files are not parsed at all.
+    Skipped files and parse errors are recorded in `report`.
+    """
+
+    def __init__(
+        self, max_file_size=None, parse_time_budget=None, skip_generated=False
+    ):
+        self.max_file_size = max_file_size
+        self.parse_time_budget = parse_time_budget
+        self.skip_generated = skip_generated
+        self.report = SkipReport()
+
+    def get_options(self):
+        """Describe the limits, for cache keys."""
+        return [self.max_file_size, self.parse_time_budget, self.skip_generated]
+
+    def check_size(self, file_path):
+        if not self.max_file_size:
+            return True
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return True  # Reported when the file is read
+        if size > self.max_file_size:
+            self.report.add(
+                file_path, f"{size} bytes, over the {self.max_file_size} bytes limit"
+            )
+            return False
+        return True
+
+    def parse(self, file_path, file_content, parse, errors):
+        """
+        Return `parse(deadline)` for a file, or [] when the file is skipped,
+        runs out of time or raises one of `errors`. A missing parser library
+        (ImportError) is not a problem of the file and is raised.
+        """
+        if self.skip_generated:
+            reason = detect_generated(file_content)
+            if reason:
+                self.report.add(file_path, reason)
+                return []
+        started = time.monotonic()
+        deadline = None
+        if self.parse_time_budget:
+            deadline = started + self.parse_time_budget
+        try:
+            return parse(deadline)
+        except ParseBudgetExceeded:
+            reason = f"parse time budget of {self.parse_time_budget}s exceeded"
+        except ImportError:
+            raise
+        except errors as e:
+            reason = f"parse error: {type(e).__name__}: {e}"
+        self.report.add(file_path, reason, time.monotonic() - started)
+        return []
+
+
+def check_deadline(deadline):
+    if deadline is not None and time.monotonic() > deadline:
+        raise ParseBudgetExceeded()
+
+
+def detect_generated(file_content):
+    """Return why a file looks minified or generated, or None."""
+    header = file_content[:GENERATED_HEADER_SIZE].lower()
+    for marker in GENERATED_MARKERS:
+        if marker in header:
+            return f"generated file ('{marker}')"
+    if len(file_content) >= MINIFIED_MIN_SIZE:
+        line_length = len(file_content) / (file_content.count("\n") + 1)
+        if line_length > MINIFIED_LINE_LENGTH:
+            return f"minified file ({line_length:.0f} characters per line)"
+    return None
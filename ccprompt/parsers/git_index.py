@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import hashlib
+import os
+import struct
+
+# Entry modes that don't describe a regular file: submodules and the
+# directory entries of sparse indexes
+GITLINK_MODE = 0o160000
+SPARSE_DIRECTORY_MODE = 0o040000
+
+
+class GitIndexEntry:
+    def __init__(self, mtime_ns, size, blob_id):
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.blob_id = blob_id
+
+
+class GitIndex:
+    """
+    Tracked files of a git working tree, read straight from `.git/index`
+    (versions 2 to 4) without running git.
+
+    Each entry keeps the stat data git recorded when the file was staged and
+    the id of the staged blob: as long as the file's size and mtime still match,
+    its content is that blob and doesn't need to be read again.
+    """
+
+    def __init__(self, repo_root, index_path):
+        self.repo_root = repo_root
+        self.entries = {}
+        with open(index_path, "rb") as f:
+            self.parse(f.read())
+
+    @classmethod
+    def find(cls, directory):
+        """Return the GitIndex of the working tree containing `directory`, if any."""
+        repo_root = find_repo_root(directory)
+        if repo_root is None:
+            return None
+        index_path = os.path.join(get_git_dir(repo_root), "index")
+        try:
+            return cls(repo_root, index_path)
+        except (IOError, OSError, ValueError, struct.error):
+            return None
+
+    def parse(self, data):
+        signature, version, entry_count = struct.unpack_from(">4sLL", data, 0)
+        if signature != b"DIRC" or version not in (2, 3, 4):
+            raise ValueError(f"Unsupported git index (version {version})")
+        offset = 12
+        path = b""
+        for _ in range(entry_count):
+            entry_start = offset
+            (
+                _ctime_s,
+                _ctime_ns,
+                mtime_s,
+                mtime_ns,
+                _dev,
+                _ino,
+                mode,
+                _uid,
+                _gid,
+                size,
+                blob_id,
+                flags,
+            ) = struct.unpack_from(">10L20sH", data, offset)
+            offset += 62
+            if version >= 3 and flags & 0x4000:
+                offset += 2  # Extended flags
+            if version == 4:
+                # Paths are prefix-compressed against the previous entry
+                strip_length, offset = read_varint(data, offset)
+                end = data.index(b"\0", offset)
+                path = path[: len(path) - strip_length] + data[offset:end]
+                offset = end + 1
+            else:
+                end = data.index(b"\0", offset)
+                path = data[offset:end]
+                # Entries are NUL padded to a multiple of 8 bytes
+                offset = entry_start + ((end - entry_start + 8) & ~7)
+
+            stage = (flags >> 12) & 0x3
+            if mode in (GITLINK_MODE, SPARSE_DIRECTORY_MODE) or stage > 1:
+                continue  # Only one entry per conflicted path
+            self.entries[os.fsdecode(path)] = GitIndexEntry(
+                mtime_s * 1_000_000_000 + mtime_ns, size, blob_id.hex()
+            )
+
+    def get_file_paths(self, directory, suffixes):
+        """Return the tracked files under `directory` ending with `suffixes`."""
+        directory = os.path.abspath(directory)
+        prefix = os.path.relpath(directory, self.repo_root).replace(os.sep, "/")
+        prefix = "" if prefix == "." else prefix + "/"
+        return [
+            os.path.join(directory, *path[len(prefix) :].split("/"))
+            for path in self.entries
+            if path.startswith(prefix) and path.endswith(suffixes)
+        ]
+
+    def get_entry(self, file_path):
+        path = os.path.relpath(os.path.abspath(file_path), self.repo_root)
+        return self.entries.get(path.replace(os.sep, "/"))
+
+
+def find_repo_root(directory):
+    current = os.path.abspath(directory)
+    while True:
+        if get_git_dir(current):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+def get_git_dir(directory):
+    dot_git = os.path.join(directory, ".git")
+    if os.path.isdir(dot_git):
+        return dot_git
+    if os.path.isfile(dot_git):
+        # Worktrees and submodules point to their git directory
+        try:
+            with open(dot_git, "r", encoding="utf-8") as f:
+                content = f.read().strip()
+        except (IOError, OSError, UnicodeDecodeError):
+            return None
+        if content.startswith("gitdir:"):
+            return os.path.join(directory, content[len("gitdir:") :].strip())
+    return None
+
+
+def read_varint(data, offset):
+    """Read the offset encoding git uses for v4 path prefixes."""
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7F
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7F)
+    return value, offset
+
+
+def get_blob_id(file_path):
+    """Compute the git blob id of a file, as `git hash-object` would."""
+    with open(file_path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha1(f"blob {len(content)}\0".encode())
+    digest.update(content)
+    return digest.hexdigest()
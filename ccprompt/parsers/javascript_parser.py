@@ -8,11 +8,19 @@
 import os
 from .base_parser import BaseParser
 from .esprima_adapter import EsprimaAdapter
+from .file_limits import FileLimits
+
+
+# Parser of the current worker process, see JavaScriptParser.parse_in_worker
+worker_parser = None
+# Files parsed with JSX syntax enabled
+JSX_EXTENSIONS = (".jsx",)
 
 
 class JavaScriptParser(BaseParser):
-    def __init__(self):
+    def __init__(self, file_limits=None):
         self.parser_adapter = EsprimaAdapter()
+        self.file_limits = file_limits or FileLimits()
 
     def find_definitions(self, name, directories):
         # Same as before
@@ -56,16 +64,11 @@ class JavaScriptParser(BaseParser):
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 file_content = f.read()
-                tree = self.parser_adapter.parse(file_content)
-                for node in tree.body:
-                    if (
-                        (
-                            node.type == "FunctionDeclaration"
-                            or node.type == "ClassDeclaration"
-                        )
-                        and node.id
-                        and node.id.name == name
-                    ):
+                tree = self.parser_adapter.parse(
+                    file_content, jsx=file_path.endswith(JSX_EXTENSIONS)
+                )
+                for node, declaration in iter_declarations(tree):
+                    if declaration.id.name == name:
                         # Extract the source code
                         code_snippet = file_content[node.range[0] : node.range[1]]
                         return code_snippet
@@ -84,23 +87,157 @@ class JavaScriptParser(BaseParser):
                         try:
                             with open(file_path, "r", encoding="utf-8") as f:
                                 file_content = f.read()
-                                tree = self.parser_adapter.parse(file_content)
-                                for node in tree.body:
+                                tree = self.parser_adapter.parse(
+                                    file_content,
+                                    jsx=file_path.endswith(JSX_EXTENSIONS),
+                                )
+                                for node, declaration in iter_declarations(tree):
                                     if (
-                                        node.type == "ClassDeclaration"
-                                        and node.id
-                                        and node.id.name == class_name
+                                        declaration.type == "ClassDeclaration"
+                                        and declaration.id.name == class_name
                                     ):
                                         class_source = file_content[
                                             node.range[0] : node.range[1]
                                         ]
-                                        super_class = None
-                                        if node.superClass and hasattr(
-                                            node.superClass, "name"
-                                        ):
-                                            super_class = node.superClass.name
+                                        super_class = get_dotted_name(
+                                            declaration.superClass
+                                        )
                                         return file_path, class_source, super_class
                         except Exception:
                             # Optionally log the error
                             pass
         return None, None, None
+
+    def find_all_definitions(self, file_path, file_content):
+        """
+        Return a record for every top-level function and class declaration of
+        a file, exported or not, and for the methods of those classes. Files
+        that fail to parse or exceed the limits are recorded in the skip report.
+        """
+        return self.file_limits.parse(
+            file_path,
+            file_content,
+            lambda deadline: self.parse_definitions(file_path, file_content, deadline),
+            (Exception,),  # esprima may fail in many ways on odd input
+        )
+
+    def parse_definitions(self, file_path, file_content, deadline):
+        records = []
+        tree = self.parser_adapter.parse(
+            file_content, deadline, jsx=file_path.endswith(JSX_EXTENSIONS)
+        )
+        for node, declaration in iter_declarations(tree):
+            name = declaration.id.name
+            if declaration.type == "FunctionDeclaration":
+                records.append(
+                    self.make_record(node, name, "function", file_path, file_content)
+                )
+            else:
+                base = get_dotted_name(declaration.superClass)
+                records.append(
+                    self.make_record(
+                        node,
+                        name,
+                        "class",
+                        file_path,
+                        file_content,
+                        [base] if base else [],
+                    )
+                )
+                for member in declaration.body.body:
+                    if member.type == "MethodDefinition" and hasattr(
+                        member.key, "name"
+                    ):
+                        records.append(
+                            self.make_record(
+                                member,
+                                member.key.name,
+                                "method",
+                                file_path,
+                                file_content,
+                                class_hierarchy=[name],
+                            )
+                        )
+        return records
+
+    @staticmethod
+    def parse_in_worker(
+        file_path, file_content, parse_time_budget=None, skip_generated=False
+    ):
+        """
+        Entry point of ParsePool workers, see `find_all_definitions`. Returns
+        the records and the skip report entries of the file.
+        """
+        global worker_parser
+        if worker_parser is None:
+            worker_parser = JavaScriptParser()
+        file_limits = worker_parser.file_limits
+        file_limits.parse_time_budget = parse_time_budget
+        file_limits.skip_generated = skip_generated
+        records = worker_parser.find_all_definitions(file_path, file_content)
+        return records, file_limits.report.pop_entries()
+
+    def make_record(
+        self,
+        node,
+        name,
+        kind,
+        file_path,
+        file_content,
+        bases=None,
+        class_hierarchy=None,
+    ):
+        start, end = node.range
+        class_hierarchy = class_hierarchy or []
+        return {
+            "name": name,
+            "qualname": ".".join(class_hierarchy + [name]),
+            "kind": kind,
+            "file_path": file_path,
+            "range": [start, end],
+            "lineno": file_content.count("\n", 0, start) + 1,
+            "end_lineno": file_content.count("\n", 0, end) + 1,
+            "bases": bases or [],
+            "metaclass": None,
+            "class_hierarchy": class_hierarchy,
+        }
+
+    def get_record_source(self, record):
+        try:
+            with open(record["file_path"], "r", encoding="utf-8") as f:
+                file_content = f.read()
+        except (IOError, OSError, UnicodeDecodeError):
+            return None
+        start, end = record["range"]
+        return file_content[start:end]
+
+
+def iter_declarations(tree):
+    """
+    Yield `(node, declaration)` for the named top-level function and class
+    declarations of a tree, `node` being the export statement of exported
+    ones.
+    """
+    for node in tree.body:
+        declaration = node
+        if node.type in ("ExportNamedDeclaration", "ExportDefaultDeclaration"):
+            declaration = node.declaration
+        if (
+            declaration is not None
+            and declaration.type in ("FunctionDeclaration", "ClassDeclaration")
+            and declaration.id
+        ):
+            yield node, declaration
+
+
+def get_dotted_name(node):
+    """Return the name of an identifier or a member expression like `React.Component`."""
+    if node is None:
+        return None
+    if node.type == "Identifier":
+        return node.name
+    if node.type == "MemberExpression" and not node.computed:
+        owner = get_dotted_name(node.object)
+        if owner and node.property.type == "Identifier":
+            return f"{owner}.{node.property.name}"
+    return None
@@ -10,5 +10,5 @@ from abc import ABC, abstractmethod
 
 class JSParserInterface(ABC):
     @abstractmethod
-    def parse(self, code):
+    def parse(self, code, deadline=None, jsx=False):
         pass
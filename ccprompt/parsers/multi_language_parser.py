@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import threading
+from collections import deque
+from .base_parser import RecordParser
+from .duplicates import DuplicateFiles, get_content_key
+from .file_limits import FileLimits
+from .parse_pool import ParseTask
+from .shard_index import OverlayIndex
+from .symbol_index import SymbolIndex
+
+# esprima doesn't parse TypeScript, .ts and .tsx files are not searched
+JAVASCRIPT_EXTENSIONS = (".js", ".jsx")
+
+
+class MultiLanguageParser(RecordParser):
+    """
+    Answer lookups for mixed-language trees from one shared SymbolIndex.
+
+    The index is built in a single traversal of the search directories, each
+    file being dispatched to the parser registered for its extension, and is
+    kept for the lifetime of the parser so every target is served from it.
+    Lookups may run on several threads, the index is only built once.
+
+    With a `parse_pool`, files of parsers that provide `parse_in_worker`
+    (JavaScript) are parsed in worker processes while the others
+    are parsed here; records are still added in the order of the files.
+    Copies of a file under other paths are parsed once, see DuplicateFiles.
+
+    With a `shard_index`, a ShardedIndex built beforehand, lookups are
+    answered from it and the search directories it covers are not read.
+    """
+
+    def __init__(
+        self,
+        parsers,
+        file_handler,
+        logger=None,
+        parse_pool=None,
+        file_limits=None,
+        shard_index=None,
+    ):
+        self.parsers = parsers
+        self.file_handler = file_handler
+        self.logger = logger
+        self.parse_pool = parse_pool
+        self.file_limits = file_limits or FileLimits()
+        self.shard_index = shard_index
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def build_index(self, directories):
+        if self.shard_index is not None:
+            uncovered = self.shard_index.get_uncovered(directories)
+            if not uncovered:
+                return self.shard_index
+            # E.g. a venv outside of the project, walked and parsed as usual
+            return OverlayIndex(self.shard_index, self.index_directories(uncovered))
+        return self.index_directories(directories)
+
+    def index_directories(self, directories):
+        key = tuple(directories)
+        with self.lock:
+            if key in self.indexes:
+                return self.indexes[key]
+            index = SymbolIndex()
+            cached_index = SymbolIndex()
+            cached_paths = set()
+            python_parser = self.parsers.get(".py")
+            if python_parser:
+                cached_paths = python_parser.add_cached_distributions(
+                    directories, cached_index
+                )
+            duplicates = DuplicateFiles()
+            linked_records = {}
+            files = self.file_handler.get_python_files(
+                directories,
+                skip_paths=cached_paths,
+                suffixes=tuple(self.parsers),
+                known_paths=linked_records,
+                duplicates=duplicates,
+            )
+            for records in self.parse_files(files, duplicates, linked_records):
+                for record in records:
+                    index.add_record(record)
+            # Installed distributions come after the project's own definitions
+            for records in cached_index.definitions.values():
+                for record in records:
+                    index.add_record(record)
+            self.indexes[key] = index
+        return self.indexes[key]
+
+    def clear_indexes(self):
+        """Forget the indexes, the next lookup reads the directories again."""
+        with self.lock:
+            self.indexes = {}
+            python_parser = self.parsers.get(".py")
+            if python_parser:
+                python_parser.clear_distributions()
+        if self.shard_index is not None:
+            self.shard_index.clear()
+
+    def parse_files(self, files, duplicates=None, linked_records=None):
+        """
+        Yield the definition records of every `(file_path, file_content)`.
+        Files without content are taken from `linked_records`, copies of a
+        file already met get its records from `duplicates`.
+        """
+        if duplicates is None:
+            duplicates = DuplicateFiles()
+        if linked_records is None:
+            linked_records = {}  # Filled while the files are listed
+        # Keep a bounded window of files in flight, in order
+        max_pending = 4 * self.parse_pool.workers if self.parse_pool else 0
+        pending = deque()
+        keys = set()
+        try:
+            for file_path, file_content in files:
+                if file_content is None:
+                    pending.append((file_path, None, linked_records.pop(file_path)))
+                else:
+                    key = get_content_key(file_content)
+                    result = None  # A copy, resolved after the original
+                    if key not in keys:
+                        keys.add(key)
+                        result = self.parse_file(file_path, file_content)
+                    pending.append((file_path, key, result))
+                while len(pending) > max_pending:
+                    yield self.resolve(pending.popleft(), duplicates)
+            while pending:
+                yield self.resolve(pending.popleft(), duplicates)
+        finally:
+            if self.parse_pool is not None:
+                self.parse_pool.close()
+
+    def parse_file(self, file_path, file_content):
+        """Parse a file here, or submit it to the pool when its parser allows."""
+        parser = self.get_parser(file_path)
+        if self.parse_pool is not None and hasattr(parser, "parse_in_worker"):
+            return self.parse_pool.submit(
+                parser.parse_in_worker,
+                file_path,
+                file_content,
+                self.file_limits.parse_time_budget,
+                self.file_limits.skip_generated,
+            )
+        return parser.find_all_definitions(file_path, file_content)
+
+    def resolve(self, entry, duplicates):
+        file_path, key, result = entry
+        if key is None:
+            return result  # Records of a linked file
+        if result is None:
+            return duplicates.get(key, file_path) or []
+        records = self.get_records(result)
+        duplicates.add(key, file_path, records)
+        return records
+
+    def get_records(self, result):
+        if not isinstance(result, ParseTask):
+            return result
+        worker_result = self.parse_pool.get(result)
+        if worker_result is None:
+            self.file_limits.report.add(
+                result.args[0],
+                "worker timed out or crashed",
+                self.parse_pool.timeout or 0.0,
+            )
+            return []
+        records, entries = worker_result
+        self.file_limits.report.extend(entries)
+        return records
+
+    def find_definition_records(self, name, directories):
+        index = self.build_index(directories)
+        for record in index.find_definitions(name):
+            source = self.get_record_source(record)
+            if source is not None:
+                yield record, source
+
+    def find_class_record(self, class_name, directories):
+        record = self.build_index(directories).find_class(class_name)
+        if record is None:
+            return None
+        return record, self.get_record_source(record)
+
+    def get_record_source(self, record):
+        return self.get_parser(record["file_path"]).get_record_source(record)
+
+    def get_parser(self, file_path):
+        return self.parsers[os.path.splitext(file_path)[1]]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import multiprocessing
+
+# Seconds a parse may take, also the default of the `parse_timeout` option
+DEFAULT_PARSE_TIMEOUT = 30
+
+
+class ParseTask:
+    def __init__(self, function, args):
+        self.function = function
+        self.args = args
+        self.async_result = None
+
+
+class ParsePool:
+    """
+    Run parsing functions in a pool of worker processes.
+
+    Results are collected with `get`, which waits at most `timeout` seconds for
+    a task. A task that takes longer, or whose worker crashed and will never
+    answer, is given up on: the pool is terminated and the other outstanding
+    tasks are submitted again to a fresh one, so a single pathological file
+    can't stall the run; those already finished keep their result. Functions
+    and arguments must be picklable.
+
+    The timeout counts from the call to `get`, not from the submission: tasks
+    are collected in order, so a task queued behind slow ones isn't charged
+    for their time, and one that was already running gets the same allowance
+    on top. A false `timeout` waits forever, which hangs the run if a worker
+    dies.
+    """
+
+    def __init__(self, workers, timeout=DEFAULT_PARSE_TIMEOUT, logger=None):
+        self.workers = workers
+        self.timeout = timeout or None
+        self.logger = logger
+        self.pool = None
+        self.tasks = []
+
+    def submit(self, function, *args):
+        task = ParseTask(function, args)
+        self.start(task)
+        self.tasks.append(task)
+        return task
+
+    def get(self, task):
+        """Return the result of `task`, or None if it timed out."""
+        try:
+            return task.async_result.get(self.timeout)
+        except multiprocessing.TimeoutError:
+            self.log(
+                f"Gave up on {task.function.__name__}{task.args[:1]} after "
+                f"{self.timeout}s, restarting the worker pool."
+            )
+            self.tasks.remove(task)
+            self.restart()
+            return None
+        finally:
+            if task in self.tasks:
+                self.tasks.remove(task)
+
+    def start(self, task):
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.workers)
+        task.async_result = self.pool.apply_async(task.function, task.args)
+
+    def restart(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = None
+        for task in self.tasks:
+            # Finished tasks keep their result, the others are run again
+            if not task.async_result.ready():
+                self.start(task)
+
+    def close(self):
+        """Stop the workers, outstanding tasks are dropped."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        self.tasks = []
+
+    def log(self, message):
+        if self.logger:
+            self.logger.warning(message)
+        else:
+            print(f"Warning: {message}")
@@ -8,24 +8,218 @@
 import os
 import ast
 import warnings
-from .base_parser import BaseParser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from .base_parser import RecordParser
+from .dist_index import DistributionIndexCache
+from .duplicates import DuplicateFiles
+from .file_limits import FileLimits, check_deadline
+from .git_index import GitIndex
+from .record_cache import FileRecordCache
+from .symbol_index import SymbolIndex, match_qualname, short_name
 
 
-class PythonParser(BaseParser):
-    def __init__(self, logger=None):
-        self.file_handler = FileHandler()
-        self.definition_finder = DefinitionFinder()
+class PythonParser(RecordParser):
+    def __init__(
+        self,
+        logger=None,
+        index_cache_dir=None,
+        use_index_cache=False,
+        io_concurrency=1,
+        use_git_index=False,
+        low_memory=False,
+        file_limits=None,
+        file_cache_dir=None,
+        file_cache_max_size=None,
+        search_roots=None,
+    ):
+        # Low-memory mode reads one file at a time
+        self.file_handler = FileHandler(
+            1 if low_memory else io_concurrency,
+            use_git_index,
+            file_limits,
+            search_roots,
+        )
+        self.definition_finder = DefinitionFinder(file_limits)
         self.logger = logger
+        self.low_memory = low_memory
+        # Records of the files parsed so far, reused by the next lookups
+        self.file_records = {}
+        # Copies of a file under other paths share its records
+        self.duplicates = DuplicateFiles()
+        # Records of the files parsed by previous runs
+        self.file_cache = (
+            FileRecordCache(
+                file_cache_dir,
+                file_cache_max_size,
+                logger,
+                self.definition_finder.file_limits.get_options(),
+            )
+            if file_cache_dir
+            else None
+        )
+        self.index_cache = (
+            DistributionIndexCache(index_cache_dir, logger) if use_index_cache else None
+        )
+        # Records of the installed distributions, by directory
+        self.distribution_records = {}
+        # Roots whose files are kept out of the caches
+        self.uncached_roots = tuple(
+            os.path.join(os.path.abspath(search_root.path), "")
+            for search_root in search_roots or ()
+            if not search_root.cache
+        )
+
+    def find_definition_records(self, name, directories):
+        files = self.iter_file_records(directories, name)
+        for file_path, file_content, records in files:
+            for record in records:
+                if record["name"] == name:
+                    yield record, self.get_source(file_content, record)
+
+    def find_class_record(self, class_name, directories):
+        """
+        Return the first class `class_name` may refer to, which can be
+        qualified by a module or by its enclosing classes, e.g. `Outer.Inner`.
+        """
+        files = self.iter_file_records(directories, short_name(class_name))
+        for file_path, file_content, records in files:
+            for record in records:
+                if record["kind"] == "class" and match_qualname(
+                    record["qualname"], class_name
+                ):
+                    return record, self.get_source(file_content, record)
+        return None
+
+    def find_class_records(self, class_names, directories):
+        """
+        Look up several classes in a single pass over the files, each
+        resolving to the same class as `find_class_record`.
+        """
+        results = dict.fromkeys(class_names)
+        pending = list(results)
+        name_filter = tuple(
+            dict.fromkeys(short_name(class_name) for class_name in pending)
+        )
+        files = self.iter_file_records(directories, name_filter)
+        for file_path, file_content, records in files:
+            for class_name in list(pending):
+                for record in records:
+                    if record["kind"] == "class" and match_qualname(
+                        record["qualname"], class_name
+                    ):
+                        results[class_name] = (
+                            record,
+                            self.get_source(file_content, record),
+                        )
+                        pending.remove(class_name)
+                        break
+            if not pending:
+                files.close()
+                break
+        return results
+
+    def iter_file_records(self, directories, name_filter=None, skip_paths=None):
+        """
+        Yield `(file_path, file_content, records)` for the Python files under
+        `directories`. Each file is parsed once: files parsed by a previous
+        lookup, or by a previous run with the file cache, are neither read nor
+        parsed again and come with no content, nor are links to them. Copies
+        of a parsed file are read but not parsed. Low-memory mode doesn't keep
+        the records of past lookups.
+
+        With the index cache, the modules of installed distributions are not
+        walked: their cached records come after the other files, with no
+        content.
+        """
+        cached_files, cached_paths = self.load_cached_distributions(directories)
+        if cached_paths:
+            skip_paths = cached_paths.union(skip_paths or ())
+        yield from self.iter_parsed_files(directories, name_filter, skip_paths)
+        for file_path, records in cached_files:
+            yield file_path, None, records
 
-    def find_definitions(self, name, directories):
-        files = self.file_handler.get_python_files(directories, name)
+    def iter_parsed_files(self, directories, name_filter=None, skip_paths=None):
+        if self.low_memory:
+            files = self.iter_files(directories, name_filter, skip_paths)
+            for file_path, file_content, line_offsets in files:
+                records = self.find_all_definitions(
+                    file_path, file_content, line_offsets
+                )
+                yield file_path, file_content, records
+            return
+        file_paths = self.file_handler.get_file_paths(directories, (".py",), skip_paths)
+        if self.file_cache:
+            file_paths = self.load_cached_records(file_paths)
+        file_paths = self.duplicates.link_files(file_paths, self.file_records)
+        files = self.file_handler.read_python_files(
+            file_paths, name_filter, known_paths=self.file_records
+        )
         for file_path, file_content in files:
-            definitions = self.definition_finder.find_definitions_in_content(
-                name, file_content
+            records = self.file_records.get(file_path)
+            if records is None:
+                records = self.duplicates.parse(
+                    file_path, file_content, self.parse_definitions
+                )
+                self.file_records[file_path] = records
+            yield file_path, file_content, records
+
+    def load_cached_records(self, file_paths):
+        """Pass `file_paths` through, loading the records cached by previous runs."""
+        for file_path in file_paths:
+            if file_path not in self.file_records and self.is_cached(file_path):
+                records = self.get_cached_records(file_path)
+                if records is not None:
+                    self.file_records[file_path] = records
+            yield file_path
+
+    def is_cached(self, file_path):
+        """Whether the records of `file_path` may go through the file cache."""
+        if self.file_cache is None:
+            return False
+        if not self.uncached_roots:
+            return True
+        return not os.path.abspath(file_path).startswith(self.uncached_roots)
+
+    def get_cached_records(self, file_path):
+        records = self.file_cache.get(file_path)
+        if records is not None:
+            for record in records:
+                record["file_path"] = file_path  # May be spelled differently
+        return records
+
+    def iter_files(self, directories, name_filter=None, skip_paths=None):
+        """
+        Yield `(file_path, file_content, line_offsets)` for the Python files
+        under `directories`, reading them one at a time for low-memory mode.
+
+        Files are read with their newlines untouched, so the byte offset of
+        every line of UTF-8 files is known and definitions can later be read
+        back from disk with a seek.
+        """
+        for file_path in self.file_handler.get_file_paths(
+            directories, (".py",), skip_paths
+        ):
+            file_content, encoding = self.file_handler.read_file_with_encoding(
+                file_path, newline=""
             )
-            for def_info in definitions:
-                def_type, code_snippet, class_hierarchy = def_info
-                yield file_path, code_snippet, class_hierarchy or def_type
+            if file_content is None:
+                self.file_handler.report_unreadable(file_path)
+                continue
+            if name_filter and not contains_name(file_content, name_filter):
+                continue  # Skip files that don't contain the target name
+            line_offsets = None
+            if encoding == "utf-8":
+                line_offsets = get_line_offsets(file_content)
+            yield file_path, file_content, line_offsets
+
+    def get_source(self, file_content, record):
+        if self.low_memory:
+            return None  # Read back from disk by get_record_source
+        if file_content is None:
+            return self.get_record_source(record)
+        return get_source_segment(file_content, record)
 
     def find_class_definition(self, class_name, directories):
         files = self.file_handler.get_python_files(directories, class_name)
@@ -38,85 +232,360 @@ class PythonParser(BaseParser):
                 return file_path, class_source, class_node
         return None  # Return None when the class is not found
 
-    def find_inheritance_chain(self, class_name, directories):
-        inheritance_chain = []
-        classes_to_trace = [class_name]
-        visited_classes = set()
+    def build_index(self, directories):
+        """
+        Parse every Python file under `directories` once and collect all class
+        and function definitions into a SymbolIndex.
 
-        while classes_to_trace:
-            current_class = classes_to_trace.pop()
-            if current_class in visited_classes:
+        When the index cache is enabled, modules installed by a distribution
+        (site-packages) are loaded from the cache and only the remaining files
+        are parsed.
+        """
+        index = SymbolIndex()
+        for _, _, records in self.iter_file_records(directories):
+            for record in records:
+                index.add_record(record)
+        return index
+
+    def add_cached_distributions(self, directories, index):
+        """
+        Add the records of the distributions installed in `directories` from
+        the index cache and return the paths of the files they cover.
+        """
+        cached_files, cached_paths = self.load_cached_distributions(directories)
+        for _, records in cached_files:
+            for record in records:
+                index.add_record(record)
+        return cached_paths
+
+    def clear_distributions(self):
+        """Forget the distribution records, the next lookups read them again."""
+        self.distribution_records = {}
+
+    def load_cached_distributions(self, directories):
+        """
+        Return `(files, paths)` for the distributions installed in
+        `directories`: their `(file_path, records)` from the index cache, and
+        the paths of the files they cover. Kept for the next lookups, except
+        in low-memory mode.
+        """
+        cached_files = []
+        cached_paths = set()
+        if self.index_cache:
+            for directory in directories:
+                distributions = self.distribution_records.get(directory)
+                if distributions is None:
+                    distributions = self.read_distributions(directory)
+                    if not self.low_memory:
+                        self.distribution_records[directory] = distributions
+                cached_files.extend(distributions[0])
+                cached_paths.update(distributions[1])
+        return cached_files, cached_paths
+
+    def read_distributions(self, directory):
+        files = {}
+        cached_paths = set()
+        search_root = self.file_handler.get_search_root(directory)
+        if search_root and not search_root.cache:
+            return [], cached_paths
+        for distribution in self.index_cache.find_distributions(directory):
+            for record in self.index_cache.load_records(distribution, self.index_files):
+                if search_root and not search_root.matches(
+                    search_root.get_relative_path(record["file_path"])
+                ):
+                    continue
+                files.setdefault(record["file_path"], []).append(record)
+            cached_paths.update(distribution.absolute_paths())
+        return list(files.items()), cached_paths
+
+    def find_all_definitions(self, file_path, file_content, line_offsets=None):
+        if line_offsets is None and self.is_cached(file_path):
+            records = self.get_cached_records(file_path)
+            if records is not None:
+                return records
+        return self.parse_definitions(file_path, file_content, line_offsets)
+
+    def parse_definitions(self, file_path, file_content, line_offsets=None):
+        records = self.definition_finder.find_all_definitions(
+            file_path, file_content, line_offsets
+        )
+        # Files without definitions are cheap to parse again, and failures
+        # must be reported on every run
+        if line_offsets is None and records and self.is_cached(file_path):
+            self.file_cache.put(file_path, records)
+        return records
+
+    def index_files(self, root, relative_paths):
+        """Return the definition records of files under `root`, with relative paths."""
+        records = []
+        for relative_path in relative_paths:
+            file_path = os.path.join(root, relative_path)
+            if not self.file_handler.check_size(file_path):
                 continue
-            visited_classes.add(current_class)
-
-            result = self.find_class_definition(current_class, directories)
-            if result:
-                file_path, class_source, class_node = result
-                inheritance_chain.append((file_path, class_source))
-                base_classes = self.definition_finder.get_base_classes(class_node)
-                for base_class in base_classes:
-                    if base_class not in visited_classes:
-                        classes_to_trace.append(base_class)
-            else:
-                # Class definition not found
-                if self.logger:
-                    self.logger.warning(
-                        f"Class or metaclass '{current_class}' not found in provided directories."
-                    )
-                else:
-                    print(
-                        f"Warning: Class or metaclass '{current_class}' not found in provided directories."
+            file_content = self.file_handler.read_file(file_path)
+            if file_content is not None:
+                records.extend(
+                    self.definition_finder.find_all_definitions(
+                        relative_path, file_content
                     )
-                continue
-        return inheritance_chain
+                )
+        return records
+
+    def get_record_source(self, record):
+        if record.get("start_offset") is not None:
+            return self.file_handler.read_segment(
+                record["file_path"], record["start_offset"], record["end_offset"]
+            )
+        file_content = self.file_handler.read_file(record["file_path"])
+        if file_content is None:
+            return None
+        return get_source_segment(file_content, record)
+
+
+def contains_name(file_content, name_filter):
+    """Whether `file_content` contains the name, or one of the names, of a filter."""
+    if isinstance(name_filter, str):
+        return name_filter in file_content
+    return any(name in file_content for name in name_filter)
+
+
+def get_source_segment(file_content, record):
+    return ast.get_source_segment(file_content, SimpleNamespace(**record))
+
+
+def get_line_offsets(file_content):
+    """
+    Return the byte offset of the start of every line of UTF-8 content read
+    without newline translation, or None when it uses lone carriage returns.
+    """
+    if file_content.count("\r") != file_content.count("\r\n"):
+        return None
+    line_offsets = [0]
+    position = 0
+    while True:
+        end = file_content.find("\n", position) + 1
+        if not end:
+            return line_offsets
+        line_offsets.append(
+            line_offsets[-1] + len(file_content[position:end].encode("utf-8"))
+        )
+        position = end
 
 
 # Helper Classes
 
 
 class FileHandler:
-    def get_python_files(self, directories, name_filter=None):
-        for directory in directories:
-            for root, _, files in os.walk(directory):
-                python_files = [file for file in files if file.endswith(".py")]
-                for file in python_files:
-                    file_path = os.path.join(root, file)
-                    file_content = None
-                    # Try reading with UTF-8 encoding
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            file_content = f.read()
-                    except UnicodeDecodeError:
-                        # Try reading with UTF-16 encoding
-                        try:
-                            with open(file_path, "r", encoding="utf-16") as f:
-                                file_content = f.read()
-                        except UnicodeDecodeError:
-                            # Skip files that can't be decoded
-                            continue
-                    except (IOError, OSError):
-                        continue  # Skip files that can't be read
-
-                    if file_content is not None:
-                        if name_filter and name_filter not in file_content:
-                            continue  # Skip files that don't contain the target name
-                        yield file_path, file_content
+    def __init__(
+        self, io_concurrency=1, use_git_index=False, file_limits=None, search_roots=None
+    ):
+        self.io_concurrency = max(1, io_concurrency or 1)
+        self.use_git_index = use_git_index
+        self.file_limits = file_limits
+        # Include/exclude globs of the configured roots, by directory
+        self.search_roots = {
+            os.path.normpath(search_root.path): search_root
+            for search_root in search_roots or ()
+        }
 
+    def get_python_files(
+        self,
+        directories,
+        name_filter=None,
+        skip_paths=None,
+        suffixes=(".py",),
+        known_paths=None,
+        duplicates=None,
+    ):
+        """
+        Yield `(file_path, file_content)` for the files under `directories`.
+        With `duplicates`, files linked to a file parsed before are added to
+        `known_paths` with its records and not read.
+        """
+        file_paths = self.get_file_paths(directories, suffixes, skip_paths)
+        if duplicates is not None:
+            file_paths = duplicates.link_files(file_paths, known_paths)
+        return self.read_python_files(file_paths, name_filter, known_paths)
 
-class DefinitionFinder:
-    def find_definitions_in_content(self, target_name, file_content):
-        definitions = []
+    def read_python_files(self, file_paths, name_filter=None, known_paths=None):
+        """
+        Yield `(file_path, file_content)` in walk order, skipping files that
+        don't contain `name_filter`, a name or a tuple of names. Files in
+        `known_paths` are not read, they are yielded with no content and the
+        caller checks them against `name_filter`.
+        """
+        if known_paths is None:
+            known_paths = ()  # May be filled while files are read
+        if self.io_concurrency > 1:
+            files = self.read_files_concurrently(file_paths, known_paths)
+        else:
+            files = (
+                (
+                    file_path,
+                    None if file_path in known_paths else self.read_file(file_path),
+                )
+                for file_path in file_paths
+            )
+        for file_path, file_content in files:
+            if file_content is not None:
+                if name_filter and not contains_name(file_content, name_filter):
+                    continue  # Skip files that don't contain the target name
+                yield file_path, file_content
+            elif file_path in known_paths:
+                yield file_path, None
+            else:
+                self.report_unreadable(file_path)
+
+    def get_file_paths(self, directories, suffixes, skip_paths=None):
+        if len(directories) > 1:
+            listings = self.list_files_concurrently(directories, suffixes)
+        else:
+            listings = (
+                self.list_files(directory, suffixes) for directory in directories
+            )
+        for file_paths in listings:
+            for file_path in file_paths:
+                if skip_paths and os.path.normpath(file_path) in skip_paths:
+                    continue  # Already covered, e.g. by the index cache
+                if not self.check_size(file_path):
+                    continue
+                yield file_path
+
+    def list_files(self, directory, suffixes):
+        search_root = self.get_search_root(directory)
+        file_paths = None
+        if self.use_git_index:
+            file_paths = self.get_tracked_files(directory, suffixes)
+            if file_paths and search_root:
+                file_paths = search_root.filter_files(
+                    file_paths, check_directories=True
+                )
+        if not file_paths:
+            file_paths = self.walk_files(directory, suffixes, search_root)
+        return file_paths
+
+    def list_files_concurrently(self, directories, suffixes):
+        """
+        List every directory on its own thread and yield the listings in the
+        order of `directories`, so walking several large roots takes about as
+        long as walking the largest one.
+        """
+        executor = ThreadPoolExecutor(max_workers=len(directories))
+        futures = [
+            executor.submit(
+                lambda directory: list(self.list_files(directory, suffixes)),
+                directory,
+            )
+            for directory in directories
+        ]
         try:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore", SyntaxWarning)
-                tree = ast.parse(file_content)
-            visitor = DefinitionVisitor(target_name, file_content)
-            visitor.visit(tree)
-            for def_info in visitor.found_definitions:
-                definitions.append(def_info)
-        except (SyntaxError, ValueError):
-            pass  # Skip files with syntax errors
-        return definitions
+            for future in futures:
+                yield future.result()
+        finally:
+            # The consumer may stop early, don't wait for the remaining walks
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_search_root(self, directory):
+        if not self.search_roots:
+            return None
+        return self.search_roots.get(os.path.normpath(directory))
+
+    def check_size(self, file_path):
+        return self.file_limits is None or self.file_limits.check_size(file_path)
+
+    def report_unreadable(self, file_path):
+        if self.file_limits is not None:
+            self.file_limits.report.add(file_path, "could not be read or decoded")
+
+    def get_tracked_files(self, directory, suffixes):
+        """
+        List the files tracked by git under `directory` from the git index.
+        Returns None outside of a working tree or when nothing under
+        `directory` is tracked (e.g. a git-ignored venv).
+        """
+        git_index = GitIndex.find(directory)
+        if git_index is None:
+            return None
+        return git_index.get_file_paths(directory, suffixes) or None
+
+    def walk_files(self, directory, suffixes, search_root=None):
+        for root, dirs, files in os.walk(directory):
+            file_paths = [
+                os.path.join(root, file) for file in files if file.endswith(suffixes)
+            ]
+            if search_root:
+                # Don't descend into excluded directories
+                dirs[:] = [
+                    name
+                    for name in dirs
+                    if not search_root.is_excluded(
+                        search_root.get_relative_path(os.path.join(root, name))
+                    )
+                ]
+                file_paths = search_root.filter_files(file_paths)
+            yield from file_paths
+
+    def read_files_concurrently(self, file_paths, known_paths=()):
+        """
+        Read files on a thread pool while the caller consumes them, so slow
+        `open`/`read` calls (network filesystems) overlap with parsing.
+        Files are yielded in walk order and at most twice `io_concurrency`
+        reads are in flight at any time.
+        """
+        max_pending = self.io_concurrency * 2
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.io_concurrency) as executor:
+            try:
+                for file_path in file_paths:
+                    future = None
+                    if file_path not in known_paths:
+                        future = executor.submit(self.read_file, file_path)
+                    pending.append((file_path, future))
+                    if len(pending) >= max_pending:
+                        file_path, future = pending.popleft()
+                        yield file_path, future.result() if future else None
+                while pending:
+                    file_path, future = pending.popleft()
+                    yield file_path, future.result() if future else None
+            finally:
+                # The consumer may stop early, e.g. on the first match
+                for _, future in pending:
+                    if future:
+                        future.cancel()
+
+    def read_file(self, file_path):
+        return self.read_file_with_encoding(file_path)[0]
+
+    def read_file_with_encoding(self, file_path, newline=None):
+        # Try reading with UTF-8 encoding
+        try:
+            with open(file_path, "r", encoding="utf-8", newline=newline) as f:
+                return f.read(), "utf-8"
+        except UnicodeDecodeError:
+            # Try reading with UTF-16 encoding
+            try:
+                with open(file_path, "r", encoding="utf-16", newline=newline) as f:
+                    return f.read(), "utf-16"
+            except UnicodeDecodeError:
+                # Skip files that can't be decoded
+                return None, None
+        except (IOError, OSError):
+            return None, None  # Skip files that can't be read
+
+    def read_segment(self, file_path, start, end):
+        """Read the UTF-8 text between two byte offsets of a file."""
+        try:
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                segment = f.read(end - start).decode("utf-8")
+        except (IOError, OSError, UnicodeDecodeError):
+            return None
+        return segment.replace("\r\n", "\n")
+
+
+class DefinitionFinder:
+    def __init__(self, file_limits=None):
+        self.file_limits = file_limits or FileLimits()
 
     def find_class_node(self, class_name, file_content):
         try:
@@ -130,6 +599,29 @@ class DefinitionFinder:
             pass
         return None
 
+    def find_all_definitions(self, file_path, file_content, line_offsets=None):
+        """
+        Return the records of every definition of a file. Files that fail to
+        parse or exceed the limits are recorded in the skip report.
+        """
+        return self.file_limits.parse(
+            file_path,
+            file_content,
+            lambda deadline: self.parse_definitions(
+                file_path, file_content, line_offsets, deadline
+            ),
+            (SyntaxError, ValueError, RecursionError),
+        )
+
+    def parse_definitions(self, file_path, file_content, line_offsets, deadline):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", SyntaxWarning)
+            tree = ast.parse(file_content)
+        check_deadline(deadline)
+        visitor = IndexVisitor(file_path, self, line_offsets, deadline)
+        visitor.visit(tree)
+        return visitor.records
+
     def get_base_classes(self, class_node):
         base_classes = []
 
@@ -167,42 +659,150 @@ class DefinitionFinder:
         return None
 
 
-class DefinitionVisitor(ast.NodeVisitor):
-    def __init__(self, target_name, source_code):
-        self.target_name = target_name
-        self.source_code = source_code
-        self.found_definitions = []
+class ClassNodeVisitor(ast.NodeVisitor):
+    def __init__(self, class_name):
+        self.class_name = class_name
+        self.class_node = None
+
+    def visit_ClassDef(self, node):
+        if node.name == self.class_name:
+            self.class_node = node
+            return  # Found the class, stop visiting
+        self.generic_visit(node)
+
+
+# Calls whose result assigned to a name defines a class
+CLASS_FACTORIES = ("namedtuple", "NamedTuple", "TypedDict", "NewType", "Enum")
+
+
+class IndexVisitor(ast.NodeVisitor):
+    """
+    Collect a record for every class and function definition of a module in a
+    single traversal, nested ones included. Records only hold positions, the
+    source is sliced from the file when it is rendered. With `line_offsets`,
+    records also get the byte offsets of the definition in the file. Visiting
+    stops with ParseBudgetExceeded once `deadline` is passed.
+
+    Module and class level assignments also define functions and classes:
+    `handler = lambda event: ...`, `Point = namedtuple(...)`,
+    `Model = type("Model", (Base,), {})`, or `Alias = SomeClass` for a class
+    of the same module, recorded as a class deriving from it.
+    """
+
+    def __init__(self, file_path, definition_finder, line_offsets=None, deadline=None):
+        self.file_path = file_path
+        self.definition_finder = definition_finder
+        self.line_offsets = line_offsets
+        self.deadline = deadline
+        self.records = []
         self.class_hierarchy = []
+        self.scopes = []
+        self.class_names = set()
 
     def visit_ClassDef(self, node):
-        if node.name == self.target_name:
-            code_snippet = self.get_code_snippet(node)
-            self.found_definitions.append(("class", code_snippet, None))
+        bases = [self.definition_finder.get_full_name(base) for base in node.bases]
+        metaclass = None
+        for keyword in node.keywords:
+            if keyword.arg == "metaclass":
+                metaclass = self.definition_finder.get_full_name(keyword.value)
+        self.add_record(
+            node, "class", bases=[base for base in bases if base], metaclass=metaclass
+        )
+        self.class_names.add(node.name)
         self.class_hierarchy.append(node.name)
+        self.scopes.append(("class", node.name))
         self.generic_visit(node)
+        self.scopes.pop()
         self.class_hierarchy.pop()
 
     def visit_FunctionDef(self, node):
-        if node.name == self.target_name:
-            code_snippet = self.get_code_snippet(node)
-            hierarchy = list(self.class_hierarchy)
-            self.found_definitions.append(("function", code_snippet, hierarchy))
+        in_class_body = bool(self.scopes) and self.scopes[-1][0] == "class"
+        self.add_record(node, "method" if in_class_body else "function", bases=[])
+        self.scopes.append(("function", node.name))
         self.generic_visit(node)
+        self.scopes.pop()
 
     def visit_AsyncFunctionDef(self, node):
         self.visit_FunctionDef(node)
 
-    def get_code_snippet(self, node):
-        return ast.get_source_segment(self.source_code, node)
+    def visit_Assign(self, node):
+        if len(node.targets) == 1:
+            self.add_assignment(node, node.targets[0], node.value)
+        self.generic_visit(node)
 
+    def visit_AnnAssign(self, node):
+        if node.value is not None:
+            self.add_assignment(node, node.target, node.value)
+        self.generic_visit(node)
 
-class ClassNodeVisitor(ast.NodeVisitor):
-    def __init__(self, class_name):
-        self.class_name = class_name
-        self.class_node = None
+    def add_assignment(self, node, target, value):
+        if not isinstance(target, ast.Name):
+            return
+        if self.scopes and self.scopes[-1][0] == "function":
+            return  # Local variables aren't definitions
+        get_full_name = self.definition_finder.get_full_name
+        if isinstance(value, ast.Lambda):
+            kind = "method" if self.scopes else "function"
+            self.add_record(node, kind, bases=[], name=target.id)
+        elif isinstance(value, ast.Call):
+            factory = short_name(get_full_name(value.func) or "")
+            bases = None
+            if (
+                factory == "type"
+                and len(value.args) == 3
+                and isinstance(value.args[1], ast.Tuple)
+            ):
+                bases = [get_full_name(base) for base in value.args[1].elts]
+            elif factory in CLASS_FACTORIES:
+                bases = []
+            if bases is not None:
+                self.add_class_assignment(node, target.id, bases)
+        elif isinstance(value, (ast.Name, ast.Attribute)):
+            aliased_name = get_full_name(value)
+            if aliased_name and short_name(aliased_name) in self.class_names:
+                self.add_class_assignment(node, target.id, [aliased_name])
 
-    def visit_ClassDef(self, node):
-        if node.name == self.class_name:
-            self.class_node = node
-            return  # Found the class, stop visiting
-        self.generic_visit(node)
+    def add_class_assignment(self, node, name, bases):
+        self.add_record(
+            node, "class", bases=[base for base in bases if base], name=name
+        )
+        self.class_names.add(name)
+
+    def generic_visit(self, node):
+        check_deadline(self.deadline)
+        super().generic_visit(node)
+
+    def get_qualname(self, name):
+        # Same convention as __qualname__, e.g. `Outer.method.<locals>.helper`
+        parts = []
+        for scope_kind, scope_name in self.scopes:
+            parts.append(scope_name)
+            if scope_kind == "function":
+                parts.append("<locals>")
+        parts.append(name)
+        return ".".join(parts)
+
+    def add_record(self, node, kind, bases, metaclass=None, name=None):
+        name = name or node.name
+        # Decorators are part of the definition, they sit at its indentation
+        decorators = getattr(node, "decorator_list", None)
+        lineno = decorators[0].lineno if decorators else node.lineno
+        record = {
+            "name": name,
+            "qualname": self.get_qualname(name),
+            "kind": kind,
+            "file_path": self.file_path,
+            "lineno": lineno,
+            "col_offset": node.col_offset,
+            "end_lineno": node.end_lineno,
+            "end_col_offset": node.end_col_offset,
+            "bases": bases,
+            "metaclass": metaclass,
+            "class_hierarchy": list(self.class_hierarchy),
+        }
+        if self.line_offsets is not None:
+            record["start_offset"] = self.line_offsets[lineno - 1] + node.col_offset
+            record["end_offset"] = (
+                self.line_offsets[node.end_lineno - 1] + node.end_col_offset
+            )
+        self.records.append(record)
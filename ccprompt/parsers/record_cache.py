@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+
+from .dist_index import INDEX_FORMAT_VERSION
+
+CACHE_DIR_NAME = "__ccprompt_cache__"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+# Share of the cap kept after an eviction, so it doesn't run on every write
+EVICTION_TARGET = 0.8
+
+
+def default_file_cache_dir(project_path):
+    return os.path.join(project_path, CACHE_DIR_NAME)
+
+
+class FileRecordCache:
+    """
+    Definition records of single files, kept across runs so unchanged files
+    are not parsed again.
+
+    Entries are marshal dumps stored under `<cache_dir>/<key[:2]>/<key>`, the
+    key covering the file's path, mtime and size, the interpreter, the record
+    format and the parse `options`, e.g. the file limits, so a modified file,
+    another Python version or other limits simply miss.
+    Reading an entry refreshes its mtime; once the entries exceed `max_size`
+    bytes the least recently used ones are evicted.
+    """
+
+    def __init__(self, cache_dir, max_size=None, logger=None, options=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size or DEFAULT_MAX_SIZE
+        self.logger = logger
+        self.options = repr(options)
+        self.size = None  # Computed on the first write
+
+    def get_key(self, file_path, stat):
+        key = (
+            f"{INDEX_FORMAT_VERSION}\n{sys.implementation.cache_tag}\n"
+            f"{marshal.version}\n{os.path.abspath(file_path)}\n"
+            f"{stat.st_mtime_ns}\n{stat.st_size}\n{self.options}"
+        )
+        return hashlib.sha256(key.encode("utf-8", "surrogateescape")).hexdigest()
+
+    def get_entry_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, file_path):
+        """Return the cached records of `file_path`, or None."""
+        try:
+            entry_path = self.get_entry_path(
+                self.get_key(file_path, os.stat(file_path))
+            )
+            with open(entry_path, "rb") as f:
+                records = marshal.load(f)
+            os.utime(entry_path)  # Mark as recently used
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        return records
+
+    def put(self, file_path, records):
+        try:
+            key = self.get_key(file_path, os.stat(file_path))
+            data = marshal.dumps(records)
+        except (OSError, ValueError):
+            return
+        entry_path = self.get_entry_path(key)
+        try:
+            if not os.path.isdir(self.cache_dir):
+                os.makedirs(self.cache_dir)
+                # Keep the cache out of version control
+                with open(os.path.join(self.cache_dir, ".gitignore"), "w") as f:
+                    f.write("*\n")
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry_path))
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, entry_path)
+        except OSError as e:
+            self.log(f"Could not write record cache entry {entry_path}: {e}")
+            return
+        if self.size is None:
+            self.size = self.get_stats()["size"]
+        else:
+            self.size += len(data)
+        if self.size > self.max_size:
+            self.evict()
+
+    def list_entries(self):
+        """Return `(mtime, size, path)` of every entry."""
+        entries = []
+        try:
+            directories = os.scandir(self.cache_dir)
+        except OSError:
+            return entries
+        with directories:
+            for directory in directories:
+                if not directory.is_dir():
+                    continue
+                with os.scandir(directory.path) as files:
+                    for entry in files:
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries down to a share of the cap."""
+        entries = sorted(self.list_entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_size * EVICTION_TARGET
+        removed = 0
+        for _, entry_size, entry_path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            size -= entry_size
+            removed += 1
+        self.size = size
+        self.log(f"Evicted {removed} record cache entries from {self.cache_dir}")
+
+    def get_stats(self):
+        entries = self.list_entries()
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(entries),
+            "size": sum(entry_size for _, entry_size, _ in entries),
+            "max_size": self.max_size,
+        }
+
+    def clear(self):
+        """Remove every entry and return how many there were."""
+        entries = self.list_entries()
+        for _, _, entry_path in entries:
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+        for directory in {os.path.dirname(entry_path) for _, _, entry_path in entries}:
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass  # Not empty
+        self.size = 0
+        return len(entries)
+
+    def log(self, message):
+        if self.logger:
+            self.logger.debug(message)
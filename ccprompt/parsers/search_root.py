@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import fnmatch
+import os
+
+
+class SearchRoot:
+    """
+    A directory searched for definitions.
+
+    Roots are searched by descending `priority`. `include` and `exclude` are
+    glob patterns matched against paths relative to the root, with `/`
+    separators: only files matching an `include` pattern (all files when there
+    is none) and no `exclude` pattern are searched, and directories matching
+    an `exclude` pattern are not walked. With `cache` false, the records of
+    the root's files are neither read from nor written to the file and index
+    caches, e.g. for a checkout that changes too often.
+    """
+
+    def __init__(self, path, priority=0, include=None, exclude=None, cache=True):
+        self.path = path
+        self.priority = priority
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.cache = cache
+
+    @classmethod
+    def from_config(cls, entry):
+        """Create a root from a path or a `search_roots` entry of the config."""
+        if isinstance(entry, str):
+            return cls(entry)
+        if not isinstance(entry, dict) or not entry.get("path"):
+            raise ValueError(f"Invalid search root, a path is required: {entry!r}")
+        return cls(
+            entry["path"],
+            entry.get("priority", 0),
+            entry.get("include"),
+            entry.get("exclude"),
+            entry.get("cache", True),
+        )
+
+    def get_relative_path(self, file_path):
+        return os.path.relpath(file_path, self.path).replace(os.sep, "/")
+
+    def matches(self, relative_path):
+        if self.include and not any(
+            fnmatch.fnmatchcase(relative_path, pattern) for pattern in self.include
+        ):
+            return False
+        return not self.is_excluded(relative_path)
+
+    def is_excluded(self, relative_path):
+        return any(
+            fnmatch.fnmatchcase(relative_path, pattern) for pattern in self.exclude
+        )
+
+    def is_excluded_directory(self, relative_path):
+        """Whether the directory at `relative_path` or one of its parents is excluded."""
+        if relative_path == ".":
+            return False
+        names = relative_path.split("/")
+        return any(
+            self.is_excluded("/".join(names[:i])) for i in range(1, len(names) + 1)
+        )
+
+    def filter_files(self, file_paths, check_directories=False):
+        """
+        Keep the files the root selects. With `check_directories`, files in
+        excluded directories are dropped too, for listings that weren't pruned
+        while walking, e.g. from the git index.
+        """
+        selected = []
+        for file_path in file_paths:
+            relative_path = self.get_relative_path(file_path)
+            if not self.matches(relative_path):
+                continue
+            if check_directories and self.is_excluded_directory(
+                relative_path.rpartition("/")[0] or "."
+            ):
+                continue
+            selected.append(file_path)
+        return selected
+
+    def get_options(self):
+        """Describe the files the root selects, for cache keys."""
+        return [os.path.abspath(self.path), self.include, self.exclude]
+
+
+def order_search_roots(search_roots):
+    """Sort roots by descending priority, keeping the given order on ties."""
+    return sorted(search_roots, key=lambda search_root: -search_root.priority)
@@ -0,0 +1,678 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import hashlib
+import json
+import marshal
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from .duplicates import relocate_records
+from .file_limits import FileLimits
+from .git_index import GitIndex, find_repo_root, get_blob_id
+from .python_parser import DefinitionFinder, FileHandler
+from .symbol_index import SymbolIndex, match_qualname, short_name
+
+SHARD_FORMAT_VERSION = 2
+INDEX_DIR_NAME = "__ccprompt_index__"
+MANIFEST_NAME = "manifest.json"
+# Directories never worth indexing
+IGNORED_DIRECTORIES = ("__pycache__", "__ccprompt_cache__", INDEX_DIR_NAME)
+
+
+def default_index_dir(project_path):
+    return os.path.join(project_path, INDEX_DIR_NAME)
+
+
+def list_shards(directory, shard_depth=1):
+    """
+    Return `(directory, recursive)` for the shards covering `directory`: one
+    for every subdirectory `shard_depth` levels below it, holding the whole
+    subtree, and one for the files directly in each shallower directory.
+    """
+    if shard_depth <= 0:
+        return [(directory, True)]
+    shards = [(directory, False)]
+    try:
+        entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+    except OSError:
+        return shards
+    for entry in entries:
+        if entry.is_dir() and not is_ignored_directory(entry.name):
+            shards.extend(list_shards(entry.path, shard_depth - 1))
+    return shards
+
+
+def is_ignored_directory(name):
+    # Hidden directories hold tooling, e.g. .git, .venv or .tox
+    return name.startswith(".") or name in IGNORED_DIRECTORIES
+
+
+def get_shard_id(relative_directory, recursive):
+    key = f"{relative_directory}\n{recursive}"
+    return hashlib.sha256(key.encode("utf-8", "surrogateescape")).hexdigest()[:24]
+
+
+def get_relative_path(path, root):
+    """Spell `path` relative to `root` with `/` separators, as stored in shards."""
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def get_absolute_path(relative_path, root):
+    return os.path.normpath(os.path.join(root, *relative_path.split("/")))
+
+
+def get_shard_files(directory, recursive, file_handler=None, tracked_files=None):
+    """
+    List the files of a shard as `file_handler` would: `tracked_files`, its
+    files listed from the git index, or a walk of `directory`, filtered by the
+    globs of the search root holding the shard and by the size limit.
+    """
+    file_handler = file_handler or FileHandler()
+    search_root = find_search_root(file_handler, directory)
+    if search_root and search_root.is_excluded_directory(
+        search_root.get_relative_path(directory)
+    ):
+        return []
+    if tracked_files is None:
+        file_paths = walk_shard(directory, recursive, (".py",), search_root)
+    else:
+        file_paths = list(tracked_files)
+    if search_root:
+        file_paths = search_root.filter_files(file_paths, check_directories=True)
+    return [file_path for file_path in file_paths if file_handler.check_size(file_path)]
+
+
+def list_tracked_files(shards, suffixes=(".py",)):
+    """
+    Return the files of each `(directory, recursive)` shard tracked by git,
+    or None for the shards holding no tracked file, e.g. a git-ignored venv,
+    to be walked instead. Each git index is read once.
+    """
+    git_indexes = {}
+    tracked_files = []
+    for directory, recursive in shards:
+        repo_root = find_repo_root(directory)
+        if repo_root not in git_indexes:
+            git_indexes[repo_root] = repo_root and GitIndex.find(repo_root)
+        git_index = git_indexes[repo_root]
+        file_paths = git_index.get_file_paths(directory, suffixes) if git_index else []
+        if not file_paths:
+            tracked_files.append(None)
+            continue
+        tracked_files.append(
+            [
+                file_path
+                for file_path in sorted(file_paths)
+                if is_shard_file(file_path, directory, recursive)
+            ]
+        )
+    return tracked_files
+
+
+def walk_shard(directory, recursive, suffixes, search_root=None):
+    file_paths = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(
+            name
+            for name in dirs
+            if recursive
+            and not is_ignored_directory(name)
+            and not (
+                search_root
+                and search_root.is_excluded(
+                    search_root.get_relative_path(os.path.join(root, name))
+                )
+            )
+        )
+        file_paths.extend(
+            os.path.join(root, file)
+            for file in sorted(files)
+            if file.endswith(suffixes)
+        )
+    return file_paths
+
+
+def is_shard_file(file_path, directory, recursive):
+    parents = os.path.relpath(file_path, directory).split(os.sep)[:-1]
+    if not recursive:
+        return not parents
+    return not any(is_ignored_directory(name) for name in parents)
+
+
+def find_search_root(file_handler, directory):
+    """Return the innermost search root of `file_handler` holding `directory`."""
+    directory = os.path.abspath(directory)
+    search_root = None
+    for path, candidate in file_handler.search_roots.items():
+        path = os.path.abspath(path)
+        if os.path.commonpath([path, directory]) == path and (
+            search_root is None or len(path) > len(os.path.abspath(search_root.path))
+        ):
+            search_root = candidate
+    return search_root
+
+
+def is_covered(directory, shard_directory, recursive):
+    """Whether the shard indexes `directory`, or part of it built from it."""
+    try:
+        common_path = os.path.commonpath([directory, shard_directory])
+    except ValueError:
+        return False  # Another drive
+    return common_path == directory or (recursive and common_path == shard_directory)
+
+
+def parse_file(file_path, file_handler=None, definition_finder=None):
+    file_handler = file_handler or FileHandler()
+    definition_finder = definition_finder or DefinitionFinder()
+    if not file_handler.check_size(file_path):
+        return []
+    file_content = file_handler.read_file(file_path)
+    if file_content is None:
+        return []
+    return definition_finder.find_all_definitions(file_path, file_content)
+
+
+def get_fingerprint(file_path):
+    try:
+        stat = os.stat(file_path)
+        return (stat.st_mtime_ns, stat.st_size, get_blob_id(file_path))
+    except OSError:
+        return None
+
+
+def is_unchanged(file_path, fingerprint):
+    mtime_ns, size, blob_id = fingerprint
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    if stat.st_size != size:
+        return False
+    if stat.st_mtime_ns == mtime_ns:
+        return True
+    # Another checkout or machine, compare the content
+    try:
+        return get_blob_id(file_path) == blob_id
+    except OSError:
+        return False
+
+
+def build_shard(
+    index_dir,
+    root,
+    directory,
+    recursive,
+    tracked_files=None,
+    limits=None,
+    search_roots=None,
+):
+    """
+    Index the files of one shard into `<index_dir>/shards/<id>` and return
+    `(shard, names, bases, skipped)` for the manifest and the skip report.
+    Paths are stored relative to `root`. Runs in worker processes, so the
+    file limits come as the arguments of a FileLimits and the files tracked
+    by git, if any, as `tracked_files`.
+    """
+    directory = os.path.abspath(directory)
+    file_limits = FileLimits(*(limits or ()))
+    file_handler = FileHandler(1, False, file_limits, search_roots)
+    definition_finder = DefinitionFinder(file_limits)
+    files = {}
+    records = []
+    for file_path in get_shard_files(directory, recursive, file_handler, tracked_files):
+        fingerprint = get_fingerprint(file_path)
+        if fingerprint is None:
+            continue
+        relative_path = get_relative_path(file_path, root)
+        files[relative_path] = fingerprint
+        records.extend(
+            relocate_records(
+                parse_file(file_path, file_handler, definition_finder), relative_path
+            )
+        )
+    relative_directory = get_relative_path(directory, root)
+    shard = {
+        "id": get_shard_id(relative_directory, recursive),
+        "directory": relative_directory,
+        "recursive": recursive,
+        "files": len(files),
+    }
+    if files:
+        write_atomic(
+            get_shard_path(index_dir, shard["id"]),
+            marshal.dumps(
+                {"version": SHARD_FORMAT_VERSION, "files": files, "records": records}
+            ),
+        )
+    names = list(dict.fromkeys(record["name"] for record in records))
+    bases = list(
+        dict.fromkeys(
+            short_name(base)
+            for record in records
+            if record["kind"] == "class"
+            for base in record["bases"]
+        )
+    )
+    return shard, names, bases, file_limits.report.pop_entries()
+
+
+def get_shard_path(index_dir, shard_id):
+    return os.path.join(index_dir, "shards", shard_id)
+
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class Manifest:
+    """
+    Top-level map of a sharded index: the shards, in search order, and for
+    every definition name and base class name the shards defining or using
+    it, as positions in the shard list.
+    """
+
+    def __init__(self, shards=None, names=None, bases=None):
+        self.shards = shards or []
+        self.names = names or {}
+        self.bases = bases or {}
+        self.positions = {shard["id"]: i for i, shard in enumerate(self.shards)}
+
+    @classmethod
+    def load(cls, index_dir):
+        with open(os.path.join(index_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != SHARD_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format in {index_dir}")
+        return cls(data["shards"], data["names"], data["bases"])
+
+    def save(self, index_dir):
+        data = {
+            "version": SHARD_FORMAT_VERSION,
+            "shards": self.shards,
+            "names": self.names,
+            "bases": self.bases,
+        }
+        write_atomic(
+            os.path.join(index_dir, MANIFEST_NAME), json.dumps(data).encode("utf-8")
+        )
+        gitignore_path = os.path.join(index_dir, ".gitignore")
+        if not os.path.exists(gitignore_path):
+            # Keep the index out of version control
+            with open(gitignore_path, "w") as f:
+                f.write("*\n")
+
+    def add_shard(self, shard, names, bases):
+        """Add or replace a shard, keeping the position of a replaced one."""
+        position = self.positions.get(shard["id"])
+        if position is None:
+            position = len(self.shards)
+            self.positions[shard["id"]] = position
+            self.shards.append(shard)
+        else:
+            self.shards[position] = shard
+            for mapping in (self.names, self.bases):
+                for name, shard_positions in list(mapping.items()):
+                    if position in shard_positions:
+                        shard_positions.remove(position)
+                        if not shard_positions:
+                            del mapping[name]
+        for name in names:
+            self.names.setdefault(name, []).append(position)
+        for base in bases:
+            self.bases.setdefault(base, []).append(position)
+
+    def get_shard_names(self):
+        """Return `(names, bases)` of every shard, in shard order."""
+        shard_names = [([], []) for _ in self.shards]
+        for i, mapping in enumerate((self.names, self.bases)):
+            for name, positions in mapping.items():
+                for position in positions:
+                    shard_names[position][i].append(name)
+        return shard_names
+
+
+def build_index(
+    index_dir,
+    directories,
+    shard_depth=1,
+    workers=1,
+    logger=None,
+    root=None,
+    use_git_index=False,
+    file_limits=None,
+    search_roots=None,
+):
+    """
+    Index `directories` into shards under `index_dir`, in `workers`
+    processes, adding them to the manifest found there. Return the number
+    of shards written.
+
+    Paths are stored relative to `root`, the project, by default the parent
+    of `index_dir`, so indexes built in other checkouts or on other machines
+    can be merged and used. Files are selected as a FileHandler with
+    `use_git_index`, `file_limits` and `search_roots` would, the skipped ones
+    are added to the report of `file_limits`.
+    """
+    root = os.path.abspath(root or get_default_root(index_dir))
+    limits = None
+    if file_limits is not None:
+        limits = (
+            file_limits.max_file_size,
+            file_limits.parse_time_budget,
+            file_limits.skip_generated,
+        )
+    shards = []
+    for directory in directories:
+        shards.extend(list_shards(directory, shard_depth))
+    shard_directories = [directory for directory, _ in shards]
+    recursive_flags = [recursive for _, recursive in shards]
+    if use_git_index:
+        tracked_files = list_tracked_files(shards)
+    else:
+        tracked_files = repeat(None)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(
+                executor.map(
+                    build_shard,
+                    repeat(index_dir),
+                    repeat(root),
+                    shard_directories,
+                    recursive_flags,
+                    tracked_files,
+                    repeat(limits),
+                    repeat(search_roots),
+                )
+            )
+    else:
+        results = list(
+            map(
+                build_shard,
+                repeat(index_dir),
+                repeat(root),
+                shard_directories,
+                recursive_flags,
+                tracked_files,
+                repeat(limits),
+                repeat(search_roots),
+            )
+        )
+    manifest = load_manifest(index_dir)
+    count = 0
+    for shard, names, bases, skipped in results:
+        if file_limits is not None:
+            file_limits.report.extend(skipped)
+        if shard["files"]:
+            manifest.add_shard(shard, names, bases)
+            count += 1
+    manifest.save(index_dir)
+    if logger:
+        logger.info(f"Indexed {count} shards into {index_dir}")
+    return count
+
+
+def merge_indexes(output_dir, input_dirs):
+    """
+    Merge the sharded indexes of `input_dirs`, built separately, into
+    `output_dir`. Shards of later inputs replace the same shards of earlier
+    ones. Return the number of shards of the merged index.
+    """
+    manifest = Manifest()
+    for input_dir in input_dirs:
+        input_manifest = Manifest.load(input_dir)
+        shard_names = input_manifest.get_shard_names()
+        for shard, (names, bases) in zip(input_manifest.shards, shard_names):
+            source = get_shard_path(input_dir, shard["id"])
+            destination = get_shard_path(output_dir, shard["id"])
+            if os.path.abspath(source) != os.path.abspath(destination):
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.copyfile(source, destination)
+            manifest.add_shard(shard, names, bases)
+    manifest.save(output_dir)
+    return len(manifest.shards)
+
+
+def get_default_root(index_dir):
+    return os.path.dirname(os.path.abspath(index_dir))
+
+
+def load_manifest(index_dir):
+    try:
+        return Manifest.load(index_dir)
+    except (OSError, ValueError, KeyError):
+        return Manifest()
+
+
+class ShardedIndex:
+    """
+    Definition index split in shards, one per package directory, answering
+    the lookups of a SymbolIndex while loading only the shards the manifest
+    lists for the names looked up.
+
+    Paths are resolved against `root`, the project, by default the parent of
+    `index_dir`. A loaded shard is checked against the size and mtime of its
+    files, or their content when the mtime differs, e.g. in another checkout;
+    the changed ones are parsed again in memory. Files and directories added
+    since the index was built are only found once it is built again. They
+    are read and parsed with `file_handler` and `definition_finder`, those of
+    the parser, so the file limits and the skip report apply to them.
+    """
+
+    def __init__(
+        self,
+        index_dir,
+        logger=None,
+        root=None,
+        file_handler=None,
+        definition_finder=None,
+    ):
+        self.index_dir = index_dir
+        self.logger = logger
+        self.root = os.path.abspath(root or get_default_root(index_dir))
+        self.file_handler = file_handler
+        self.definition_finder = definition_finder
+        self.manifest = None
+        self.shards = {}
+        self.uncovered = {}
+        self.lock = threading.Lock()  # Shared by concurrent extractions
+
+    def clear(self):
+        """Forget the loaded shards, the next lookups read them again."""
+        with self.lock:
+            self.manifest = None
+            self.shards = {}
+            self.uncovered = {}
+
+    def get_uncovered(self, directories):
+        """
+        Return the `directories` the index holds no shard of, e.g. a
+        site-packages outside of the project, to be searched otherwise.
+        """
+        key = tuple(directories)
+        with self.lock:
+            if key in self.uncovered:
+                return self.uncovered[key]
+        shards = [
+            (get_absolute_path(shard["directory"], self.root), shard["recursive"])
+            for shard in self.get_manifest().shards
+        ]
+        uncovered = [
+            directory
+            for directory in directories
+            if not any(
+                is_covered(os.path.abspath(directory), shard_directory, recursive)
+                for shard_directory, recursive in shards
+            )
+        ]
+        if uncovered:
+            self.log(
+                f"Not in the index in {self.index_dir}, searched without it: "
+                + ", ".join(uncovered)
+            )
+        with self.lock:
+            self.uncovered[key] = uncovered
+        return uncovered
+
+    def get_manifest(self):
+        if self.manifest is None:
+            try:
+                self.manifest = Manifest.load(self.index_dir)
+            except (OSError, ValueError, KeyError) as e:
+                self.log(f"Could not load the index in {self.index_dir}: {e}", True)
+                self.manifest = Manifest()
+        return self.manifest
+
+    def get_records(self, positions):
+        """Return the records of the shards at `positions`, in manifest order."""
+        records = []
+        for position in sorted(set(positions)):
+            records.extend(self.load_shard(position))
+        return records
+
+    def load_shard(self, position):
+        with self.lock:
+            if position not in self.shards:
+                self.shards[position] = self.read_shard(
+                    self.get_manifest().shards[position]
+                )
+            return self.shards[position]
+
+    def read_shard(self, shard):
+        try:
+            with open(get_shard_path(self.index_dir, shard["id"]), "rb") as f:
+                data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            self.log(f"Could not read shard of {shard['directory']}: {e}", True)
+            return []
+        records = data["records"]
+        for record in records:
+            record["file_path"] = get_absolute_path(record["file_path"], self.root)
+        changed = []
+        for relative_path, fingerprint in data["files"].items():
+            file_path = get_absolute_path(relative_path, self.root)
+            if not is_unchanged(file_path, fingerprint):
+                changed.append(file_path)
+        if changed:
+            self.log(
+                f"{len(changed)} file(s) of {shard['directory']} changed since "
+                f"the index was built, run `ccprompt index build` to update it",
+                True,
+            )
+            changed_paths = set(changed)
+            records = [
+                record for record in records if record["file_path"] not in changed_paths
+            ]
+            for file_path in changed:
+                if os.path.exists(file_path):
+                    records.extend(
+                        parse_file(file_path, self.file_handler, self.definition_finder)
+                    )
+        return records
+
+    def find_definitions(self, name):
+        positions = self.get_manifest().names.get(name, [])
+        return [
+            record for record in self.get_records(positions) if record["name"] == name
+        ]
+
+    def find_class(self, class_name):
+        for record in self.find_definitions(short_name(class_name)):
+            if record["kind"] == "class" and match_qualname(
+                record["qualname"], class_name
+            ):
+                return record
+        return None
+
+    def find_subclasses(self, base_name, overlay=None):
+        """
+        Load the shards of the whole subclass tree, then walk it. Subclasses
+        found in `overlay`, a SymbolIndex of other directories, are followed
+        and returned as well.
+        """
+        manifest = self.get_manifest()
+        positions = set()
+        seen = set()
+        pending = [short_name(base_name)]
+        while pending:
+            current = pending.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            current_positions = manifest.bases.get(current, [])
+            positions.update(current_positions)
+            for record in self.get_records(current_positions):
+                if record["kind"] == "class" and any(
+                    short_name(base) == current for base in record["bases"]
+                ):
+                    pending.append(record["name"])
+            if overlay is not None:
+                pending.extend(
+                    record["name"] for record in overlay.subclasses.get(current, [])
+                )
+        index = SymbolIndex()
+        for record in self.get_records(positions):
+            index.add_record(record)
+        if overlay is not None:
+            overlay_records = {}
+            for name in seen:
+                for record in overlay.subclasses.get(name, []):
+                    overlay_records[id(record)] = record
+            for record in overlay_records.values():
+                index.add_record(record)
+        return index.find_subclasses(base_name)
+
+    def find_overrides(self, method_name):
+        return [
+            record
+            for record in self.find_definitions(method_name)
+            if record["kind"] == "method"
+        ]
+
+    def log(self, message, warning=False):
+        if self.logger:
+            if warning:
+                self.logger.warning(message)
+            else:
+                self.logger.debug(message)
+
+
+class OverlayIndex:
+    """
+    Lookups of a ShardedIndex followed by those of `index`, a SymbolIndex of
+    the search directories the sharded index doesn't cover.
+    """
+
+    def __init__(self, shard_index, index):
+        self.shard_index = shard_index
+        self.index = index
+
+    def find_definitions(self, name):
+        return self.shard_index.find_definitions(name) + self.index.find_definitions(
+            name
+        )
+
+    def find_class(self, class_name):
+        record = self.shard_index.find_class(class_name)
+        if record is None:
+            record = self.index.find_class(class_name)
+        return record
+
+    def find_subclasses(self, base_name):
+        return self.shard_index.find_subclasses(base_name, self.index)
+
+    def find_overrides(self, method_name):
+        return self.shard_index.find_overrides(method_name) + self.index.find_overrides(
+            method_name
+        )
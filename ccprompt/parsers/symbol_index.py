@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+
+class SymbolIndex:
+    """
+    Name-keyed index of definition records collected in a single pass over the
+    search directories.
+
+    Besides the forward lookup (name -> definitions) it keeps two reverse maps:
+    base class name -> direct subclasses, and method name -> every class-level
+    definition of that method, so both questions are answered with a dict lookup.
+    """
+
+    def __init__(self):
+        self.definitions = {}
+        self.subclasses = {}
+        self.overrides = {}
+
+    def add_record(self, record):
+        self.definitions.setdefault(record["name"], []).append(record)
+        if record["kind"] == "class":
+            for base in record["bases"]:
+                self.subclasses.setdefault(short_name(base), []).append(record)
+        elif record["kind"] == "method":
+            self.overrides.setdefault(record["name"], []).append(record)
+
+    def find_definitions(self, name):
+        return list(self.definitions.get(name, []))
+
+    def find_class(self, class_name):
+        """Return the first class `class_name` may refer to, see `match_qualname`."""
+        for record in self.definitions.get(short_name(class_name), []):
+            if record["kind"] == "class" and match_qualname(
+                record["qualname"], class_name
+            ):
+                return record
+        return None
+
+    def find_subclasses(self, base_name):
+        """
+        Return every class deriving from `base_name`, directly or indirectly,
+        in breadth-first order.
+        """
+        subclasses = []
+        seen = set()
+        pending = [short_name(base_name)]
+        while pending:
+            current = pending.pop(0)
+            for record in self.subclasses.get(current, []):
+                key = (record["file_path"], record["lineno"], record["name"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                subclasses.append(record)
+                pending.append(record["name"])
+        return subclasses
+
+    def find_overrides(self, method_name):
+        return list(self.overrides.get(method_name, []))
+
+
+def short_name(name):
+    """Strip the module path from a dotted name, e.g. `models.Model` -> `Model`."""
+    return name.rsplit(".", 1)[-1]
+
+
+def match_qualname(qualname, dotted_name):
+    """
+    Whether a name as written in the source, e.g. in a base class list, may
+    refer to the definition with `qualname`: `models.Model` matches `Model`,
+    `Outer.Inner` matches `Outer.Inner`, and `Inner` used within the body of
+    `Outer` matches `Outer.Inner`.
+    """
+    return (
+        qualname == dotted_name
+        or dotted_name.endswith("." + qualname)
+        or qualname.endswith("." + dotted_name)
+    )
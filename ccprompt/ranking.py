@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import math
+import re
+from collections import Counter
+
+from ccprompt.utils import get_search_root_index
+
+IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+# Weight of a block found in each search root, the project coming first
+ORIGIN_WEIGHTS = (1.0, 0.6)
+REFERENCE_WEIGHT = 0.25
+
+
+class BlockRanker:
+    """
+    Order extracted blocks by relevance to the requested targets.
+
+    A block scores higher the closer it is to a target in the inheritance
+    graph, when it comes from the project rather than from site-packages,
+    and the more often its name is referenced in the source of the targets.
+    Scoring is linear in the size of the blocks, sorting is O(n log n).
+    """
+
+    def __init__(self, search_directories, top_k=None, budget=None):
+        self.search_directories = search_directories
+        self.top_k = top_k
+        self.budget = budget
+
+    def rank(self, blocks):
+        """Return the selected blocks, most relevant first."""
+        references = self.count_references(blocks)
+        # Sorting is stable, equal scores keep the discovery order
+        ranked = sorted(
+            blocks, key=lambda block: self.score(block, references), reverse=True
+        )
+        return self.select(ranked)
+
+    def count_references(self, blocks):
+        """Count the identifiers used by the targets themselves."""
+        references = Counter()
+        for block in blocks:
+            if block["depth"] == 0 and block["source"]:
+                references.update(IDENTIFIER.findall(block["source"]))
+        return references
+
+    def score(self, block, references):
+        name = block["qualname"].rsplit(".", 1)[-1]
+        root_index = get_search_root_index(block["file_path"], self.search_directories)
+        origin = ORIGIN_WEIGHTS[min(root_index, len(ORIGIN_WEIGHTS) - 1)]
+        # A definition always mentions its own name once
+        reference_count = references[name] - (1 if block["depth"] == 0 else 0)
+        return origin / (1 + block["depth"]) + REFERENCE_WEIGHT * math.log1p(
+            max(reference_count, 0)
+        )
+
+    def select(self, ranked):
+        if self.top_k:
+            ranked = ranked[: self.top_k]
+        if not self.budget:
+            return ranked
+        # Keep the best blocks that fit in the budget, in characters of source
+        selected = []
+        remaining = self.budget
+        for block in ranked:
+            size = len(block["source"] or "")
+            if size <= remaining:
+                selected.append(block)
+                remaining -= size
+        return selected
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import hashlib
+import json
+import os
+import tempfile
+
+from .parsers.dist_index import default_cache_dir
+from .parsers.git_index import GitIndex, find_repo_root, get_blob_id
+
+# Bump whenever the layout of the stored blocks changes
+RESULT_FORMAT_VERSION = 4
+
+
+class ResultCache:
+    """
+    Cache of the blocks extracted for a target, stored under
+    `<cache_dir>/results/<key>.json` together with the size, mtime and git blob
+    id of every file the blocks came from. With `use_git_index`, the blob id of
+    a file whose stat data matches the git index is taken from the index
+    instead of hashing the file.
+
+    An entry stays valid as long as none of those files changed. Files that
+    did not contribute to the result are not tracked, so a definition added to
+    a new file is only picked up once a contributing file changes or the cache
+    is disabled. The options changing which files are searched or how they are
+    read are part of the keys.
+    """
+
+    def __init__(
+        self,
+        cache_dir=None,
+        logger=None,
+        use_git_index=False,
+        search_roots=None,
+        skip_generated=False,
+        max_file_size=None,
+        low_memory=False,
+        shard_index_dir=None,
+    ):
+        self.cache_dir = os.path.join(cache_dir or default_cache_dir(), "results")
+        self.logger = logger
+        self.use_git_index = use_git_index
+        self.search_roots = search_roots or []
+        self.skip_generated = skip_generated
+        self.max_file_size = max_file_size
+        self.low_memory = low_memory
+        self.shard_index_dir = shard_index_dir
+        self.repo_roots = {}
+        self.git_indexes = {}
+
+    def get_key(self, target_name, search_directories, language, first_match):
+        options = [
+            RESULT_FORMAT_VERSION,
+            target_name,
+            [os.path.abspath(directory) for directory in search_directories],
+            language,
+            first_match,
+            self.use_git_index,
+            self.skip_generated,
+            self.max_file_size,
+            self.low_memory,
+            os.path.abspath(self.shard_index_dir) if self.shard_index_dir else None,
+        ]
+        if self.search_roots:
+            # The globs of the roots select the files searched
+            options.append(
+                [search_root.get_options() for search_root in self.search_roots]
+            )
+        return hashlib.sha256(json.dumps(options).encode()).hexdigest()
+
+    def get(self, key):
+        try:
+            with open(self.get_entry_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            files, blocks = entry["files"], entry["blocks"]
+        except (IOError, OSError, ValueError, KeyError):
+            return None
+        for file_path, fingerprint in files.items():
+            if not self.is_unchanged(file_path, fingerprint):
+                self.log(f"{file_path} changed, discarding cached result {key}")
+                return None
+        return blocks
+
+    def put(self, key, blocks):
+        files = {}
+        for block in blocks:
+            file_path = block["file_path"]
+            if file_path not in files:
+                fingerprint = self.get_fingerprint(file_path)
+                if fingerprint is None:
+                    return  # Don't cache results we can't validate
+                files[file_path] = fingerprint
+        entry_path = self.get_entry_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"blocks": blocks, "files": files}, f)
+            os.replace(tmp_path, entry_path)
+        except (IOError, OSError) as e:
+            self.log(f"Could not write result cache entry {entry_path}: {e}")
+
+    def is_unchanged(self, file_path, fingerprint):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        if stat.st_size != fingerprint["size"]:
+            return False
+        if stat.st_mtime_ns == fingerprint["mtime_ns"]:
+            return True
+        # Touched but possibly not modified, compare the content
+        try:
+            return self.get_blob_id(file_path, stat) == fingerprint["blob_id"]
+        except OSError:
+            return False
+
+    def get_fingerprint(self, file_path):
+        try:
+            stat = os.stat(file_path)
+            return {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "blob_id": self.get_blob_id(file_path, stat),
+            }
+        except OSError:
+            return None
+
+    def get_blob_id(self, file_path, stat):
+        if self.use_git_index:
+            git_index = self.get_git_index(os.path.dirname(file_path))
+            entry = git_index.get_entry(file_path) if git_index else None
+            if (
+                entry
+                and entry.size == stat.st_size
+                and entry.mtime_ns == stat.st_mtime_ns
+            ):
+                return entry.blob_id
+        return get_blob_id(file_path)
+
+    def get_git_index(self, directory):
+        if directory not in self.repo_roots:
+            self.repo_roots[directory] = find_repo_root(directory)
+        repo_root = self.repo_roots[directory]
+        if repo_root is None:
+            return None
+        if repo_root not in self.git_indexes:
+            self.git_indexes[repo_root] = GitIndex.find(repo_root)
+        return self.git_indexes[repo_root]
+
+    def get_entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def log(self, message):
+        if self.logger:
+            self.logger.debug(message)
@@ -5,6 +5,7 @@
 # CCprompt is free software, you can redistribute it and/or
 # modify it under the terms of the MIT License; see LICENSE file details.
 
+import os
 import time
 
 
@@ -24,3 +25,12 @@ def time_it(func):
         return result
 
     return wrapper
+
+
+def get_search_root_index(file_path, search_directories):
+    file_path = os.path.abspath(file_path)
+    for i, directory in enumerate(search_directories):
+        directory = os.path.abspath(directory)
+        if os.path.commonpath([directory, file_path]) == directory:
+            return i
+    return len(search_directories) - 1
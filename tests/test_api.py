@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import ccprompt
+
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary directory to hold test files
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.test_path = self.test_dir.name
+        with open(os.path.join(self.test_path, "models.py"), "w") as f:
+            f.write(
+                "class Base:\n    pass\n\n"
+                "class Model(Base):\n    def save(self):\n        pass\n\n"
+                "def helper():\n    pass\n"
+            )
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def test_extract(self):
+        result = ccprompt.extract(["save", "helper"], self.test_path)
+        self.assertEqual(
+            [block["qualname"] for block in result],
+            ["Model", "Base", "Model.save", "helper"],
+        )
+        self.assertEqual(result.blocks[1]["depth"], 2)
+        self.assertNotIn("class_name", result.blocks[0])
+        self.assertEqual(result.skipped_files, [])
+
+        self.assertIn("File: ", result.render())
+        self.assertEqual(len(json.loads(result.render("json"))), 4)
+
+    def test_iter_extract(self):
+        blocks = ccprompt.iter_extract(["Model"], self.test_path)
+        self.assertTrue(next(blocks)["source"].startswith("class Model(Base):"))
+        blocks.close()
+
+    def test_project_reuses_index(self):
+        project = ccprompt.Project(self.test_path)
+        with patch.object(
+            project.parser.file_handler,
+            "get_python_files",
+            wraps=project.parser.file_handler.get_python_files,
+        ) as mock_get_files:
+            project.extract(["Model"])
+            project.extract(["helper"], subclasses=["Base"])
+            self.assertEqual(mock_get_files.call_count, 1)
+
+            project.refresh()
+            project.extract(["Model"])
+            self.assertEqual(mock_get_files.call_count, 2)
+
+    def test_concurrent_extractions(self):
+        project = ccprompt.Project(self.test_path)
+        expected = ccprompt.extract(["save"], self.test_path).blocks
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda _: project.extract(["save"]).blocks, range(16))
+            )
+        self.assertEqual(results, [expected] * 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
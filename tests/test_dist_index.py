@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from ccprompt.api import Project
+from ccprompt.main import extract_code
+from ccprompt.parsers.python_parser import DefinitionFinder, PythonParser
+
+
+class TestDistributionIndexCache(unittest.TestCase):
+    def setUp(self):
+        # Create a fake site-packages directory and a cache directory
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.site_packages = os.path.join(self.test_dir.name, "site-packages")
+        self.cache_dir = os.path.join(self.test_dir.name, "cache")
+
+        self.write_file("pkg/__init__.py", "")
+        self.write_file("pkg/models.py", "class Model:\n    pass\n")
+        self.write_file(
+            "pkg-1.0.dist-info/METADATA",
+            "Metadata-Version: 2.1\nName: pkg\nVersion: 1.0\n",
+        )
+        self.write_file(
+            "pkg-1.0.dist-info/RECORD",
+            "pkg/__init__.py,sha256=abc,0\n"
+            "pkg/models.py,sha256=def,22\n"
+            "pkg-1.0.dist-info/RECORD,,\n",
+        )
+        # A module that is not owned by any distribution
+        self.write_file("loose.py", "class Loose(Model):\n    pass\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def write_file(self, relative_path, content):
+        file_path = os.path.join(self.site_packages, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def build_index(self):
+        parser = PythonParser(index_cache_dir=self.cache_dir, use_index_cache=True)
+        return parser.build_index([self.site_packages])
+
+    def test_distribution_indexed_once(self):
+        index = self.build_index()
+        records = index.find_definitions("Model")
+        self.assertEqual(len(records), 1)
+        self.assertEqual(
+            records[0]["file_path"], os.path.join(self.site_packages, "pkg/models.py")
+        )
+        entries = [files for _, _, files in os.walk(self.cache_dir) if files]
+        self.assertEqual(len(entries), 1)
+
+        # A module changed since the install is parsed again, files outside
+        # of any distribution are always scanned
+        self.write_file("pkg/models.py", "class Renamed:\n    pass\n")
+        self.write_file("loose.py", "class Loose2(Renamed):\n    pass\n")
+        index = self.build_index()
+        self.assertEqual(index.find_definitions("Model"), [])
+        self.assertEqual(len(index.find_definitions("Renamed")), 1)
+        self.assertEqual(
+            [record["name"] for record in index.find_subclasses("Renamed")],
+            ["Loose2"],
+        )
+
+    def test_project_refresh(self):
+        project_path = os.path.join(self.test_dir.name, "project")
+        os.makedirs(project_path)
+        project = Project(
+            project_path,
+            self.site_packages,
+            index_cache_dir=self.cache_dir,
+            use_index_cache=True,
+        )
+        self.assertEqual(len(project.extract(["Model"]).blocks), 1)
+        self.write_file("pkg/models.py", "class Renamed:\n    pass\n")
+        project.refresh()
+        self.assertEqual(project.extract(["Model"]).blocks, [])
+        self.assertEqual(len(project.extract(["Renamed"]).blocks), 1)
+
+    def test_cache_shared_across_site_packages(self):
+        self.build_index()
+        # Same distribution installed somewhere else reuses the entry
+        other = os.path.join(self.test_dir.name, "other-site-packages")
+        os.rename(self.site_packages, other)
+        parser = PythonParser(index_cache_dir=self.cache_dir, use_index_cache=True)
+        with patch.object(parser, "index_files") as mock_index_files:
+            records = parser.build_index([other]).find_definitions("Model")
+        mock_index_files.assert_not_called()
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records[0]["file_path"], os.path.join(other, "pkg/models.py"))
+
+        # A removed module no longer has definitions
+        os.remove(os.path.join(other, "pkg/models.py"))
+        parser = PythonParser(index_cache_dir=self.cache_dir, use_index_cache=True)
+        self.assertEqual(parser.build_index([other]).find_definitions("Model"), [])
+
+    def test_extraction_uses_cache(self):
+        project = os.path.join(self.test_dir.name, "project")
+        os.makedirs(project)
+        with open(os.path.join(project, "app.py"), "w", encoding="utf-8") as f:
+            f.write("from pkg.models import Model\n\nclass App(Model):\n    pass\n")
+        output_file = os.path.join(self.test_dir.name, "output.txt")
+        parsed = []
+        find_all_definitions = DefinitionFinder.find_all_definitions
+
+        def record_parse(finder, file_path, *args):
+            parsed.append(os.path.basename(file_path))
+            return find_all_definitions(finder, file_path, *args)
+
+        with patch.object(DefinitionFinder, "find_all_definitions", record_parse):
+            for _ in range(2):
+                extract_code(
+                    ["App"],
+                    project,
+                    self.site_packages,
+                    output_file=output_file,
+                    index_cache_dir=self.cache_dir,
+                    use_index_cache=True,
+                )
+                with open(output_file, "r", encoding="utf-8") as f:
+                    self.assertIn("class Model:", f.read())
+        # The installed modules are parsed by the first run only
+        self.assertEqual(parsed.count("models.py"), 1)
+        self.assertEqual(parsed.count("app.py"), 2)
+
+        # The source of a module edited since is read from its new positions
+        self.write_file(
+            "pkg/models.py", "import os\nimport sys\n\nclass Model:\n    pass\n"
+        )
+        extract_code(
+            ["Model"],
+            project,
+            self.site_packages,
+            output_file=output_file,
+            index_cache_dir=self.cache_dir,
+            use_index_cache=True,
+        )
+        with open(output_file, "r", encoding="utf-8") as f:
+            output_content = f.read()
+        self.assertIn("class Model:\n    pass", output_content)
+        self.assertNotIn("import sys", output_content)
+
+
+if __name__ == "__main__":
+    unittest.main()
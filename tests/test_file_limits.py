@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import tempfile
+import unittest
+from ccprompt.parsers.esprima_adapter import EsprimaAdapter
+from ccprompt.parsers.file_limits import FileLimits, detect_generated
+from ccprompt.parsers.javascript_parser import JavaScriptParser
+from ccprompt.parsers.python_parser import PythonParser
+
+
+class TestFileLimits(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary directory to hold test files
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.test_path = self.test_dir.name
+        self.write_test_file("small.py", "class Small:\n    pass\n")
+        self.write_test_file(
+            "large.py", "class Large:\n" + "    x = 1\n" * 1000 + "\nclass Small:\n"
+        )
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def write_test_file(self, filename, content):
+        with open(os.path.join(self.test_path, filename), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def get_reasons(self, file_limits):
+        return {
+            os.path.basename(file_path): reason
+            for file_path, (reason, _) in file_limits.report.entries.items()
+        }
+
+    def test_max_file_size(self):
+        file_limits = FileLimits(max_file_size=1000)
+        parser = PythonParser(file_limits=file_limits)
+        index = parser.build_index([self.test_path])
+        self.assertEqual(index.find_definitions("Large"), [])
+        self.assertEqual(len(index.find_definitions("Small")), 1)
+        self.assertIn(
+            "over the 1000 bytes limit", self.get_reasons(file_limits)["large.py"]
+        )
+
+    def test_parse_errors_are_reported(self):
+        # The unfinished class in large.py fails to parse
+        file_limits = FileLimits()
+        parser = PythonParser(file_limits=file_limits)
+        parser.build_index([self.test_path])
+        reasons = self.get_reasons(file_limits)
+        self.assertTrue(reasons["large.py"].startswith("parse error: IndentationError"))
+        self.assertNotIn("small.py", reasons)
+
+    def test_parse_time_budget(self):
+        file_limits = FileLimits(parse_time_budget=1e-9)
+        parser = PythonParser(file_limits=file_limits)
+        self.assertEqual(parser.build_index([self.test_path]).definitions, {})
+        self.assertIn("budget", self.get_reasons(file_limits)["small.py"])
+
+    @unittest.skipUnless(EsprimaAdapter.available, "esprima is not installed")
+    def test_javascript_parse_time_budget(self):
+        file_limits = FileLimits(parse_time_budget=1e-9)
+        parser = JavaScriptParser(file_limits)
+        self.assertEqual(parser.find_all_definitions("app.js", "function f() {}"), [])
+        self.assertIn("budget", self.get_reasons(file_limits)["app.js"])
+
+    def test_detect_generated(self):
+        self.assertIn(
+            "protocol buffer",
+            detect_generated(
+                "# Generated by the protocol buffer compiler.  DO NOT EDIT!"
+            ),
+        )
+        self.assertIn("minified", detect_generated("var a=1;" * 1000))
+        self.assertIsNone(detect_generated("class Small:\n    pass\n" * 500))
+
+        file_limits = FileLimits(skip_generated=True)
+        self.write_test_file("stub_pb2.py", "# @generated\nclass Stub:\n    pass\n")
+        parser = PythonParser(file_limits=file_limits)
+        self.assertEqual(
+            parser.build_index([self.test_path]).find_definitions("Stub"), []
+        )
+        self.assertIn("generated", self.get_reasons(file_limits)["stub_pb2.py"])
+
+
+if __name__ == "__main__":
+    unittest.main()
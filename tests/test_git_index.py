@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from ccprompt.parsers.git_index import GitIndex, get_blob_id
+from ccprompt.parsers.python_parser import FileHandler
+from ccprompt.result_cache import ResultCache
+
+
+@unittest.skipUnless(shutil.which("git"), "git is required to create the index")
+class TestGitIndex(unittest.TestCase):
+    def setUp(self):
+        # Create a git repository with tracked and untracked files
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.repo = self.test_dir.name
+        self.git("init", "-q")
+        self.write_file("app/models.py", "class Model:\n    pass\n")
+        self.write_file("app/views/" + "a" * 40 + ".py", "def view():\n    pass\n")
+        self.write_file("README.md", "# Test\n")
+        self.git("add", ".")
+        self.write_file("app/untracked.py", "class Junk:\n    pass\n")
+        self.write_file(".venv/site-packages/lib.py", "class Lib:\n    pass\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def git(self, *args):
+        subprocess.run(["git", *args], cwd=self.repo, check=True)
+
+    def write_file(self, relative_path, content):
+        file_path = os.path.join(self.repo, relative_path)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def assert_tracked_files(self):
+        git_index = GitIndex.find(os.path.join(self.repo, "app"))
+        self.assertEqual(git_index.repo_root, os.path.abspath(self.repo))
+        file_paths = git_index.get_file_paths(os.path.join(self.repo, "app"), ".py")
+        self.assertEqual(
+            sorted(os.path.relpath(path, self.repo) for path in file_paths),
+            [
+                os.path.join("app", "models.py"),
+                os.path.join("app", "views", "a" * 40 + ".py"),
+            ],
+        )
+        models = os.path.join(self.repo, "app", "models.py")
+        entry = git_index.get_entry(models)
+        self.assertEqual(entry.blob_id, get_blob_id(models))
+        self.assertEqual(entry.size, os.stat(models).st_size)
+
+    def test_index_version_2(self):
+        self.git("update-index", "--index-version", "2")
+        self.assert_tracked_files()
+
+    def test_index_version_4(self):
+        self.git("update-index", "--index-version", "4")
+        self.assert_tracked_files()
+
+    def test_file_handler_uses_git_index(self):
+        file_handler = FileHandler(use_git_index=True)
+        names = [
+            os.path.basename(file_path)
+            for file_path, _ in file_handler.get_python_files([self.repo])
+        ]
+        self.assertIn("models.py", names)
+        self.assertNotIn("untracked.py", names)
+        self.assertNotIn("lib.py", names)
+
+        # Untracked roots, like a venv inside the project, are walked
+        venv = os.path.join(self.repo, ".venv", "site-packages")
+        files = list(file_handler.get_python_files([venv]))
+        self.assertEqual([os.path.basename(path) for path, _ in files], ["lib.py"])
+
+    def test_result_cache_fingerprint(self):
+        models = os.path.join(self.repo, "app", "models.py")
+        result_cache = ResultCache(
+            os.path.join(self.repo, ".cache"), use_git_index=True
+        )
+        fingerprint = result_cache.get_fingerprint(models)
+        self.assertEqual(
+            fingerprint["blob_id"], GitIndex.find(self.repo).get_entry(models).blob_id
+        )
+        self.assertTrue(result_cache.is_unchanged(models, fingerprint))
+
+        self.write_file("app/models.py", "class Model:\n    value = 1\n")
+        self.assertFalse(result_cache.is_unchanged(models, fingerprint))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,9 +7,10 @@
 
 import unittest
 import os
+import sys
 import tempfile
 from unittest.mock import patch
-from ccprompt.main import extract_code
+from ccprompt.main import extract_code, extract_target
 import logging
 
 
@@ -125,6 +126,217 @@ class SampleClass:
         self.assertIn("def method_function(self):", output_content)
         self.assertIn("class SampleClass:", output_content)
 
+    @patch("ccprompt.main.Path")
+    def test_extract_code_low_memory(self, mock_path):
+        # Mock the output file path
+        mock_output = tempfile.NamedTemporaryFile(delete=False)
+        mock_path.return_value = mock_output.name
+
+        # Call extract_code reading sources back from disk
+        extract_code(
+            target_names=["method_function", "DerivedClass"],
+            project_path=self.test_path,
+            venv_site_packages_path=None,
+            output_file=mock_output.name,
+            language="python",
+            logger=self.logger,
+            low_memory=True,
+        )
+
+        # Read the output file
+        with open(mock_output.name, "r") as f:
+            output_content = f.read()
+
+        # Check that every block has its source
+        self.assertIn("def method_function(self):", output_content)
+        self.assertIn("class SampleClass:", output_content)
+        self.assertIn("class DerivedClass(BaseClass):", output_content)
+        self.assertIn("class BaseClass:", output_content)
+        self.assertNotIn("None", output_content)
+
+    @patch("ccprompt.main.Path")
+    def test_extract_code_subclasses(self, mock_path):
+        # Mock the output file path
+        mock_output = tempfile.NamedTemporaryFile(delete=False)
+        mock_path.return_value = mock_output.name
+
+        # Call extract_code with only a reverse lookup
+        extract_code(
+            target_names=[],
+            project_path=self.test_path,
+            venv_site_packages_path=None,
+            output_file=mock_output.name,
+            language="python",
+            logger=self.logger,
+            subclasses=["BaseClass"],
+        )
+
+        # Read the output file
+        with open(mock_output.name, "r") as f:
+            output_content = f.read()
+
+        # Check that only the subclass is included
+        self.assertIn("class DerivedClass(BaseClass):", output_content)
+        self.assertNotIn("class BaseClass:", output_content)
+
+    @patch("ccprompt.main.Path")
+    def test_extract_code_first_match(self, mock_path):
+        # Mock the output file path
+        mock_output = tempfile.NamedTemporaryFile(delete=False)
+        mock_path.return_value = mock_output.name
+
+        # A site-packages directory defining the same function
+        venv_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(venv_dir.cleanup)
+        with open(os.path.join(venv_dir.name, "venv_code.py"), "w") as f:
+            f.write("def standalone_function():\n    return 'venv'\n")
+
+        # Call extract_code in first-match mode
+        with self.assertLogs(self.logger, level="INFO") as logs:
+            extract_code(
+                target_names=["standalone_function"],
+                project_path=self.test_path,
+                venv_site_packages_path=venv_dir.name,
+                output_file=mock_output.name,
+                language="python",
+                logger=self.logger,
+                first_match=True,
+            )
+
+        # Read the output file
+        with open(mock_output.name, "r") as f:
+            output_content = f.read()
+
+        # Check that only the project definition is included
+        self.assertIn("test_code.py", output_content)
+        self.assertNotIn("return 'venv'", output_content)
+        self.assertTrue(
+            any(
+                f"skipped search roots: {venv_dir.name}" in line for line in logs.output
+            )
+        )
+
+    @patch("ccprompt.main.Path")
+    def test_extract_code_result_cache(self, mock_path):
+        # Mock the output file path
+        mock_output = tempfile.NamedTemporaryFile(delete=False)
+        mock_path.return_value = mock_output.name
+        cache_dir = os.path.join(self.test_path, ".cache")
+
+        def run():
+            extract_code(
+                target_names=["DerivedClass", "standalone_function"],
+                project_path=self.test_path,
+                venv_site_packages_path=None,
+                output_file=mock_output.name,
+                language="python",
+                logger=self.logger,
+                index_cache_dir=cache_dir,
+                use_result_cache=True,
+            )
+            with open(mock_output.name, "r") as f:
+                return f.read()
+
+        first_output = run()
+
+        # Unchanged sources are served from the cache without searching
+        with patch("ccprompt.main.extract_target") as mock_extract_target:
+            self.assertEqual(run(), first_output)
+            mock_extract_target.assert_not_called()
+
+        # Changing a contributing file re-extracts the targets using it
+        self.write_test_file(
+            "test_code.py", self.sample_code.replace("pass", "return None")
+        )
+        output_content = run()
+        self.assertNotEqual(output_content, first_output)
+        self.assertIn("return None", output_content)
+
+    @patch("ccprompt.main.Path")
+    def test_result_cache_missing_base(self, mock_path):
+        mock_output = tempfile.NamedTemporaryFile(delete=False)
+        mock_path.return_value = mock_output.name
+        cache_dir = os.path.join(self.test_path, ".cache")
+        self.write_test_file("app.py", "class App(Missing, Exception):\n    pass\n")
+
+        def run(**kwargs):
+            extract_code(
+                target_names=["App"],
+                project_path=self.test_path,
+                output_file=mock_output.name,
+                logger=self.logger,
+                index_cache_dir=cache_dir,
+                use_result_cache=True,
+                **kwargs,
+            )
+            with open(mock_output.name, "r") as f:
+                return f.read()
+
+        self.assertNotIn("class Missing", run())
+        # A base class added later is found, the result was not cached
+        self.write_test_file("missing.py", "class Missing:\n    pass\n")
+        self.assertIn("class Missing", run())
+
+        # Options changing the files searched don't share entries
+        with patch("ccprompt.main.extract_target", wraps=extract_target) as mock:
+            run()
+            mock.assert_not_called()
+            run(skip_generated=True)
+            mock.assert_called_once()
+
+    @patch("ccprompt.main.Path")
+    def test_result_cache_standard_bases(self, mock_path):
+        mock_output = tempfile.NamedTemporaryFile(delete=False)
+        mock_path.return_value = mock_output.name
+        cache_dir = os.path.join(self.test_path, ".cache")
+        self.write_test_file(
+            "shapes.py",
+            "from abc import ABC\nimport enum as e\n\n"
+            "class Shape(ABC):\n    pass\n\nclass Color(e.Enum):\n    pass\n",
+        )
+
+        def run():
+            extract_code(
+                target_names=["Shape", "Color"],
+                project_path=self.test_path,
+                output_file=mock_output.name,
+                logger=self.logger,
+                index_cache_dir=cache_dir,
+                use_result_cache=True,
+            )
+
+        run()
+        # Bases from the standard library are never found, the results are cached
+        with patch("ccprompt.main.extract_target") as mock_extract_target:
+            run()
+            if hasattr(sys, "stdlib_module_names"):
+                mock_extract_target.assert_not_called()
+
+    @patch("ccprompt.main.Path")
+    def test_extract_code_same_name_classes(self, mock_path):
+        mock_output = tempfile.NamedTemporaryFile(delete=False)
+        mock_path.return_value = mock_output.name
+        for directory in ("first", "second"):
+            os.makedirs(os.path.join(self.test_path, directory))
+            self.write_test_file(
+                os.path.join(directory, "foo.py"),
+                f"class Foo(BaseClass):\n    name = '{directory}'\n",
+            )
+
+        extract_code(
+            target_names=["Foo", "DerivedClass"],
+            project_path=self.test_path,
+            output_file=mock_output.name,
+            logger=self.logger,
+        )
+        with open(mock_output.name, "r") as f:
+            output_content = f.read()
+
+        # Both definitions are extracted, their shared base only once
+        self.assertIn("name = 'first'", output_content)
+        self.assertIn("name = 'second'", output_content)
+        self.assertEqual(output_content.count("class BaseClass:"), 1)
+
     @patch("ccprompt.main.Path")
     def test_extract_code_nonexistent(self, mock_path):
         # Mock the output file path
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from ccprompt.parser_factory import ParserFactory
+from ccprompt.parsers.esprima_adapter import EsprimaAdapter
+from ccprompt.parsers.javascript_parser import JavaScriptParser
+
+
+@unittest.skipUnless(EsprimaAdapter.available, "esprima is not installed")
+class TestMultiLanguageParser(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary directory holding Python and JavaScript files
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.test_path = self.test_dir.name
+
+        self.write_test_file(
+            "models.py",
+            "class Base:\n    pass\n\nclass Model(Base):\n    def save(self):\n        pass\n",
+        )
+        self.write_test_file(
+            "widgets.js",
+            "class Widget {\n  render() { return 1; }\n}\n\n"
+            "class Button extends Widget {\n  render() { return 2; }\n}\n\n"
+            "function mount(widget) { return widget; }\n",
+        )
+        self.write_test_file("component.jsx", "function App() { return null; }\n")
+
+        self.parser = ParserFactory.get_parser("auto")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def write_test_file(self, filename, content):
+        with open(os.path.join(self.test_path, filename), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_single_traversal(self):
+        # All targets are answered from the index built by the first lookup
+        with patch.object(
+            self.parser.file_handler,
+            "get_python_files",
+            wraps=self.parser.file_handler.get_python_files,
+        ) as mock_get_files:
+            for name in ("Model", "Button", "mount", "App"):
+                definitions = list(self.parser.find_definitions(name, [self.test_path]))
+                self.assertEqual(len(definitions), 1, name)
+            self.assertEqual(mock_get_files.call_count, 1)
+
+    def test_find_definitions(self):
+        _, source, extra_info = next(
+            self.parser.find_definitions("mount", [self.test_path])
+        )
+        self.assertEqual(source, "function mount(widget) { return widget; }")
+        self.assertEqual(extra_info, "function")
+
+        renders = list(self.parser.find_definitions("render", [self.test_path]))
+        self.assertEqual(
+            [extra_info for _, _, extra_info in renders], [["Widget"], ["Button"]]
+        )
+
+    def test_find_inheritance_chain(self):
+        chain = self.parser.find_inheritance_chain("Button", [self.test_path])
+        self.assertEqual(len(chain), 2)
+        self.assertTrue(chain[1][1].startswith("class Widget {"))
+
+        chain = self.parser.find_inheritance_chain("Model", [self.test_path])
+        self.assertEqual(
+            [source.split("(")[0].split(":")[0] for _, source in chain],
+            ["class Model", "class Base"],
+        )
+
+    def test_reverse_lookups(self):
+        index = self.parser.build_index([self.test_path])
+        self.assertEqual(
+            [r["name"] for r in index.find_subclasses("Widget")], ["Button"]
+        )
+        self.assertEqual(len(index.find_overrides("render")), 2)
+
+        # A parser without an index reports it, reverse lookups are skipped
+        javascript_parser = JavaScriptParser()
+        with patch("builtins.print") as mock_print:
+            self.assertIsNone(javascript_parser.build_index([self.test_path]))
+        mock_print.assert_called_once()
+
+    def test_modules_and_jsx(self):
+        self.write_test_file(
+            "views.js",
+            'import React from "react";\n'
+            "export class Foo extends Base {}\n"
+            "export default function render() { return null; }\n"
+            "class Bar {}\n",
+        )
+        self.write_test_file(
+            "panel.jsx",
+            'import React from "react";\n\n'
+            "export class Panel extends React.Component {\n"
+            '  render() { return <div className="panel">{this.props.title}</div>; }\n'
+            "}\n",
+        )
+        self.write_test_file("types.ts", "function typed(value: number) {}\n")
+        index = self.parser.build_index([self.test_path])
+        for name in ("Foo", "render", "Bar", "Panel"):
+            self.assertTrue(index.find_definitions(name), name)
+        foo = index.find_definitions("Foo")[0]
+        self.assertEqual(foo["bases"], ["Base"])
+        self.assertTrue(
+            self.parser.get_record_source(foo).startswith("export class Foo")
+        )
+        panel = index.find_definitions("Panel")[0]
+        self.assertEqual(panel["bases"], ["React.Component"])
+        self.assertEqual(
+            [r["name"] for r in index.find_subclasses("Component")], ["Panel"]
+        )
+        # TypeScript files are not searched, nor reported as failing
+        self.assertEqual(index.find_definitions("typed"), [])
+        self.assertEqual(self.parser.file_limits.report.get_entries(), [])
+
+    def test_parse_workers(self):
+        # Worker processes produce the same index, in the same order
+        parser = ParserFactory.get_parser("auto", parse_workers=2, parse_timeout=30)
+        index = parser.build_index([self.test_path])
+        expected = self.parser.build_index([self.test_path])
+        self.assertEqual(index.definitions, expected.definitions)
+        self.assertIsNone(parser.parse_pool.pool)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import gzip
+import json
+import logging
+import os
+import tempfile
+import unittest
+from ccprompt.main import extract_code
+from ccprompt.output import OutputWriter
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.test_path = self.test_dir.name
+        self.blocks = [
+            {
+                "file_path": f"/src/module_{i}.py",
+                "qualname": f"Class{i}",
+                "kind": "class",
+                "start_line": 1,
+                "end_line": 2,
+                "depth": i,
+                "source": f"class Class{i}:\n    pass",
+                "class_name": f"Class{i}",
+            }
+            for i in range(5)
+        ]
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def write_blocks(self, filename, **options):
+        writer = OutputWriter(os.path.join(self.test_path, filename), **options)
+        for block in self.blocks:
+            writer.write(block)
+        return writer.close()
+
+    def test_json(self):
+        (path,) = self.write_blocks("out.json", output_format="json")
+        with open(path) as f:
+            blocks = json.load(f)
+        self.assertEqual([block["depth"] for block in blocks], [0, 1, 2, 3, 4])
+        self.assertNotIn("class_name", blocks[0])
+
+    def test_markdown(self):
+        (path,) = self.write_blocks("out.md", output_format="markdown")
+        with open(path) as f:
+            content = f.read()
+        self.assertIn(
+            "## Class1\n\n`/src/module_1.py` lines 1-2 (class, depth 1)", content
+        )
+        self.assertIn("```python\nclass Class1:\n    pass\n```", content)
+
+    def test_chunked_gzip_jsonl(self):
+        paths = self.write_blocks(
+            "out.jsonl", output_format="jsonl", compression="gzip", chunk_size=400
+        )
+        self.assertGreater(len(paths), 1)
+        self.assertEqual(os.path.basename(paths[0]), "out.001.jsonl.gz")
+        qualnames = []
+        for path in paths:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                qualnames.extend(json.loads(line)["qualname"] for line in f)
+        self.assertEqual(qualnames, [block["qualname"] for block in self.blocks])
+
+    def test_chunked_json_chunks_are_valid(self):
+        paths = self.write_blocks("out.json", output_format="json", chunk_size=1)
+        self.assertEqual(len(paths), len(self.blocks))
+        for path in paths:
+            with open(path) as f:
+                self.assertEqual(len(json.load(f)), 1)
+
+    def test_extract_code_jsonl(self):
+        with open(os.path.join(self.test_path, "code.py"), "w") as f:
+            f.write(
+                "class Base:\n    pass\n\nclass Derived(Base):\n    def run(self):\n        pass\n"
+            )
+        output_file = os.path.join(self.test_path, "out.jsonl")
+        extract_code(
+            target_names=["run"],
+            project_path=self.test_path,
+            output_file=output_file,
+            logger=logging.getLogger("test_logger"),
+            output_format="jsonl",
+        )
+        with open(output_file) as f:
+            blocks = [json.loads(line) for line in f]
+        self.assertEqual(
+            [(b["qualname"], b["kind"], b["depth"]) for b in blocks],
+            [
+                ("Derived", "class", 1),
+                ("Base", "class", 2),
+                ("Derived.run", "method", 0),
+            ],
+        )
+        self.assertEqual((blocks[2]["start_line"], blocks[2]["end_line"]), (5, 6))
+
+    def test_collapse_duplicates(self):
+        # Test that identical definitions of several files are written once
+        vendor_path = os.path.join(self.test_path, "vendor")
+        os.makedirs(vendor_path)
+        code = "def helper():\n    pass\n"
+        for directory in (self.test_path, vendor_path):
+            with open(os.path.join(directory, "helpers.py"), "w") as f:
+                f.write(code)
+        output_file = os.path.join(self.test_path, "out.jsonl")
+        extract_code(
+            target_names=["helper"],
+            project_path=self.test_path,
+            output_file=output_file,
+            logger=logging.getLogger("test_logger"),
+            output_format="jsonl",
+            collapse_duplicate_blocks=True,
+        )
+        with open(output_file) as f:
+            blocks = [json.loads(line) for line in f]
+        self.assertEqual(len(blocks), 1)
+        paths = [blocks[0]["file_path"], *blocks[0]["duplicate_paths"]]
+        self.assertEqual(
+            sorted(paths),
+            sorted(
+                os.path.join(directory, "helpers.py")
+                for directory in (self.test_path, vendor_path)
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import time
+import unittest
+from ccprompt.parsers.parse_pool import DEFAULT_PARSE_TIMEOUT, ParsePool
+
+
+class TestParsePool(unittest.TestCase):
+    def setUp(self):
+        self.pool = ParsePool(2, timeout=0.5)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_results_in_order(self):
+        tasks = [self.pool.submit(abs, -i) for i in range(10)]
+        self.assertEqual([self.pool.get(task) for task in tasks], list(range(10)))
+
+    def test_timeout(self):
+        # A stuck task is skipped and the tasks queued behind it still complete
+        stuck = self.pool.submit(time.sleep, 60)
+        tasks = [self.pool.submit(abs, -i) for i in range(4)]
+        started = time.monotonic()
+        self.assertIsNone(self.pool.get(stuck))
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual([self.pool.get(task) for task in tasks], [0, 1, 2, 3])
+
+    def test_crashed_worker(self):
+        # A worker that dies never answers, its task times out
+        self.assertEqual(ParsePool(2).timeout, DEFAULT_PARSE_TIMEOUT)
+        crashed = self.pool.submit(os._exit, 1)
+        tasks = [self.pool.submit(abs, -i) for i in range(4)]
+        started = time.monotonic()
+        self.assertIsNone(self.pool.get(crashed))
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertEqual([self.pool.get(task) for task in tasks], [0, 1, 2, 3])
+
+    def test_finished_tasks_not_run_again(self):
+        stuck = self.pool.submit(time.sleep, 60)
+        done = self.pool.submit(abs, -1)
+        done.async_result.wait(10)
+        async_result = done.async_result
+        self.assertIsNone(self.pool.get(stuck))
+        self.assertIs(done.async_result, async_result)
+        self.assertEqual(self.pool.get(done), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,7 +10,8 @@ import unittest
 import os
 import tempfile
 import warnings
-from ccprompt.parsers.python_parser import PythonParser
+from unittest.mock import patch
+from ccprompt.parsers.python_parser import FileHandler, PythonParser
 
 
 class TestPythonParser(unittest.TestCase):
@@ -176,6 +177,183 @@ class SampleClass:
         )
         self.assertEqual(len(definitions), 0)
 
+    def test_find_subclasses(self):
+        # Test the reverse lookup of classes deriving from a base class
+        self.write_test_file(
+            "test_subclass.py",
+            "import pkg\n\nclass GrandChild(DerivedClass):\n    pass\n\n"
+            "class Dotted(pkg.BaseClass):\n    pass\n",
+        )
+        index = self.parser.build_index([self.test_path])
+        names = [record["name"] for record in index.find_subclasses("BaseClass")]
+        self.assertEqual(sorted(names), ["DerivedClass", "Dotted", "GrandChild"])
+        self.assertLess(names.index("DerivedClass"), names.index("GrandChild"))
+        self.assertEqual(index.find_subclasses("GrandChild"), [])
+
+    def test_find_overrides(self):
+        # Test the reverse lookup of classes defining a method
+        self.write_test_file(
+            "test_override.py",
+            "class OtherClass:\n    def method_function(self):\n"
+            "        def method_function():\n            pass\n",
+        )
+        index = self.parser.build_index([self.test_path])
+        records = index.find_overrides("method_function")
+        self.assertEqual(
+            sorted(record["class_hierarchy"][-1] for record in records),
+            ["OtherClass", "SampleClass"],
+        )
+        source = self.parser.get_record_source(records[0])
+        self.assertTrue(source.startswith("def method_function(self):"))
+        self.assertEqual(index.find_overrides("standalone_function"), [])
+
+    def test_nested_and_assigned_definitions(self):
+        # Test that a single pass records every kind of definition
+        self.write_test_file(
+            "test_nested.py",
+            "from collections import namedtuple\n\n"
+            "class Outer:\n    class Inner:\n        pass\n\n"
+            "    @property\n    def value(self):\n"
+            "        def helper():\n            pass\n\n"
+            "class Child(Outer.Inner):\n    pass\n\n"
+            "handler = lambda event: event\n"
+            "Point = namedtuple('Point', 'x y')\n"
+            "Dynamic = type('Dynamic', (Child,), {})\n"
+            "Alias = Outer\n",
+        )
+        file_path = os.path.join(self.test_path, "test_nested.py")
+        with open(file_path, encoding="utf-8") as f:
+            records = self.parser.find_all_definitions(file_path, f.read())
+        self.assertEqual(
+            [(record["qualname"], record["kind"]) for record in records],
+            [
+                ("Outer", "class"),
+                ("Outer.Inner", "class"),
+                ("Outer.value", "method"),
+                ("Outer.value.<locals>.helper", "function"),
+                ("Child", "class"),
+                ("handler", "function"),
+                ("Point", "class"),
+                ("Dynamic", "class"),
+                ("Alias", "class"),
+            ],
+        )
+        source = self.parser.get_record_source(records[2])
+        self.assertEqual(source.splitlines()[0], "@property")
+
+        # Nested classes used as bases are resolved by their qualified name
+        chain = self.parser.find_inheritance_records("Dynamic", [self.test_path])
+        self.assertEqual(
+            [record["qualname"] for record, _, _ in chain],
+            ["Dynamic", "Child", "Outer.Inner"],
+        )
+
+    def test_inheritance_levels_are_batched(self):
+        # Test that all the mixins of a level are looked up in one pass
+        self.write_test_file(
+            "test_mixins.py",
+            "class Base:\n    pass\n\nclass AMixin(Base):\n    pass\n\n"
+            "class BMixin:\n    pass\n\nclass CMixin:\n    pass\n\n"
+            "class View(AMixin, BMixin, CMixin):\n    pass\n",
+        )
+        with patch.object(
+            self.parser, "iter_file_records", wraps=self.parser.iter_file_records
+        ) as mock_iter:
+            chain = self.parser.find_inheritance_records("View", [self.test_path])
+        self.assertEqual(mock_iter.call_count, 3)
+        self.assertEqual(
+            [(record["name"], depth) for record, _, depth in chain],
+            [("View", 0), ("CMixin", 1), ("BMixin", 1), ("AMixin", 1), ("Base", 2)],
+        )
+
+    def test_files_are_parsed_once(self):
+        # Test that later lookups reuse the records of parsed files
+        with patch.object(
+            self.parser.definition_finder,
+            "find_all_definitions",
+            wraps=self.parser.definition_finder.find_all_definitions,
+        ) as mock_find:
+            self.parser.find_inheritance_chain("DerivedClass", [self.test_path])
+            self.parser.build_index([self.test_path])
+            parsed = [call.args[0] for call in mock_find.call_args_list]
+        self.assertEqual(len(parsed), len(set(parsed)))
+
+    def test_duplicate_files_are_parsed_once(self):
+        # Test that links and copies of a file share its records
+        os.link(
+            os.path.join(self.test_path, "test_class.py"),
+            os.path.join(self.test_path, "test_link.py"),
+        )
+        self.write_test_file("test_copy.py", self.sample_code_class)
+        with patch.object(
+            self.parser.file_handler,
+            "read_file",
+            wraps=self.parser.file_handler.read_file,
+        ) as mock_read:
+            with patch.object(
+                self.parser.definition_finder,
+                "find_all_definitions",
+                wraps=self.parser.definition_finder.find_all_definitions,
+            ) as mock_find:
+                index = self.parser.build_index([self.test_path])
+            read = [os.path.basename(call.args[0]) for call in mock_read.call_args_list]
+            parsed = [
+                os.path.basename(call.args[0]) for call in mock_find.call_args_list
+            ]
+        # Only the first of the two linked paths walked is read
+        self.assertEqual(len({"test_class.py", "test_link.py"} & set(read)), 1)
+        self.assertEqual(
+            len({"test_class.py", "test_copy.py", "test_link.py"} & set(parsed)), 1
+        )
+        self.assertEqual(
+            sorted(
+                os.path.basename(record["file_path"])
+                for record in index.find_definitions("DerivedClass")
+            ),
+            ["test_class.py", "test_copy.py", "test_link.py"],
+        )
+
+    def test_concurrent_file_reading(self):
+        # Test that concurrent reads yield the same files in walk order
+        for i in range(10):
+            self.write_test_file(f"test_module_{i}.py", f"class Module{i}:\n    pass\n")
+        sequential = list(FileHandler().get_python_files([self.test_path]))
+        concurrent = list(
+            FileHandler(io_concurrency=3).get_python_files([self.test_path])
+        )
+        self.assertEqual(concurrent, sequential)
+
+        # Stopping early must not wait for or leak the remaining reads
+        files = FileHandler(io_concurrency=3).get_python_files([self.test_path])
+        self.assertEqual(next(files), sequential[0])
+        files.close()
+
+        parser = PythonParser(io_concurrency=4)
+        result = parser.find_class_definition("Module7", [self.test_path])
+        self.assertTrue(result[0].endswith("test_module_7.py"))
+
+    def test_low_memory_mode(self):
+        # Test that sources are read back from disk by byte offset
+        file_path = os.path.join(self.test_path, "test_offsets.py")
+        with open(file_path, "w", encoding="utf-8", newline="") as f:
+            f.write('# é\r\nclass Offsets:\r\n    """Ünïcode"""\r\n')
+        parser = PythonParser(low_memory=True)
+        definitions = list(parser.find_definition_records("Offsets", [self.test_path]))
+        self.assertEqual(len(definitions), 1)
+        record, source = definitions[0]
+        self.assertIsNone(source)
+        self.assertIn("start_offset", record)
+        self.assertEqual(
+            parser.get_record_source(record), 'class Offsets:\n    """Ünïcode"""'
+        )
+
+        # UTF-16 files have no offsets and are read in full
+        record, _ = parser.find_class_record("EncodingTest", [self.test_path])
+        self.assertNotIn("start_offset", record)
+        self.assertEqual(
+            parser.get_record_source(record), "class EncodingTest:\n    pass"
+        )
+
     def test_logging(self):
         # Test that logging works (simplified for testing purposes)
         import logging
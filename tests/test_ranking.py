@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import unittest
+from ccprompt.ranking import BlockRanker
+
+
+def make_block(qualname, file_path, depth, source):
+    return {
+        "file_path": file_path,
+        "qualname": qualname,
+        "kind": "class",
+        "start_line": 1,
+        "end_line": 1,
+        "depth": depth,
+        "source": source,
+    }
+
+
+class TestBlockRanker(unittest.TestCase):
+    def setUp(self):
+        self.project = os.path.join(os.sep, "project")
+        self.site_packages = os.path.join(os.sep, "venv", "site-packages")
+        self.blocks = [
+            make_block(
+                "View",
+                os.path.join(self.project, "views.py"),
+                0,
+                "class View(Mixin, Base):\n    serializer = Serializer()\n"
+                "    other = Serializer()\n    last = Serializer()\n",
+            ),
+            make_block(
+                "Base", os.path.join(self.site_packages, "base.py"), 1, "class Base:"
+            ),
+            make_block(
+                "Mixin", os.path.join(self.project, "mixins.py"), 1, "class Mixin:"
+            ),
+            make_block(
+                "Serializer",
+                os.path.join(self.site_packages, "serializers.py"),
+                2,
+                "class Serializer:",
+            ),
+            make_block(
+                "Object",
+                os.path.join(self.site_packages, "base.py"),
+                3,
+                "class Object:",
+            ),
+        ]
+        self.search_directories = [self.project, self.site_packages]
+
+    def ranked_names(self, blocks):
+        return [block["qualname"] for block in blocks]
+
+    def test_rank(self):
+        # Closer, project and referenced definitions come first
+        ranker = BlockRanker(self.search_directories)
+        self.assertEqual(
+            self.ranked_names(ranker.rank(self.blocks)),
+            ["View", "Mixin", "Serializer", "Base", "Object"],
+        )
+
+    def test_top_k_and_budget(self):
+        ranker = BlockRanker(self.search_directories, top_k=2)
+        self.assertEqual(self.ranked_names(ranker.rank(self.blocks)), ["View", "Mixin"])
+
+        # Blocks that don't fit are skipped, smaller ones may still fit
+        budget = len(self.blocks[0]["source"]) + len("class Base:")
+        ranker = BlockRanker(self.search_directories, budget=budget)
+        self.assertEqual(self.ranked_names(ranker.rank(self.blocks)), ["View", "Base"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from ccprompt.parsers.file_limits import FileLimits
+from ccprompt.parsers.python_parser import PythonParser
+from ccprompt.parsers.record_cache import FileRecordCache
+
+
+class TestFileRecordCache(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary project holding its own cache directory
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.test_path = self.test_dir.name
+        self.cache_dir = os.path.join(self.test_path, "__ccprompt_cache__")
+        self.file_path = os.path.join(self.test_path, "models.py")
+        self.write_file("class Base:\n    pass\n\nclass Model(Base):\n    pass\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def write_file(self, content, mtime_ns=None):
+        with open(self.file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        if mtime_ns:
+            os.utime(self.file_path, ns=(mtime_ns, mtime_ns))
+
+    def test_warm_run_skips_parsing(self):
+        parser = PythonParser(file_cache_dir=self.cache_dir)
+        chain = parser.find_inheritance_chain("Model", [self.test_path])
+        self.assertEqual(len(chain), 2)
+
+        # A new parser, as in the next run, doesn't parse or read the file
+        parser = PythonParser(file_cache_dir=self.cache_dir)
+        finder = parser.definition_finder
+        with patch.object(finder, "find_all_definitions") as mock_find:
+            with patch.object(parser.file_handler, "read_file") as mock_read:
+                index = parser.build_index([self.test_path])
+        mock_find.assert_not_called()
+        mock_read.assert_not_called()
+        self.assertEqual(
+            index.find_definitions("Model")[0]["file_path"], self.file_path
+        )
+
+    def test_modified_file_misses(self):
+        file_cache = FileRecordCache(self.cache_dir)
+        file_cache.put(self.file_path, [{"name": "Base"}])
+        self.assertEqual(file_cache.get(self.file_path), [{"name": "Base"}])
+        self.write_file("class Changed:\n    pass\n", mtime_ns=10**18)
+        self.assertIsNone(file_cache.get(self.file_path))
+
+    def test_file_limits_miss(self):
+        self.write_file(
+            "# Code generated by protoc. DO NOT EDIT.\nclass Model:\n    pass\n"
+        )
+        PythonParser(file_cache_dir=self.cache_dir).build_index([self.test_path])
+        # Records cached without the limits are not served with them
+        file_limits = FileLimits(skip_generated=True)
+        parser = PythonParser(file_cache_dir=self.cache_dir, file_limits=file_limits)
+        index = parser.build_index([self.test_path])
+        self.assertEqual(index.find_definitions("Model"), [])
+        self.assertEqual(
+            [file_path for file_path, _, _ in file_limits.report.get_entries()],
+            [self.file_path],
+        )
+
+    def test_lru_eviction_and_clear(self):
+        file_cache = FileRecordCache(self.cache_dir, max_size=1000)
+        records = [{"name": "x" * 200}]
+        for i in range(8):
+            self.write_file(f"# {i}\n", mtime_ns=(i + 1) * 10**18)
+            file_cache.put(self.file_path, records)
+            if i == 0:
+                first_entry = file_cache.get_entry_path(
+                    file_cache.get_key(self.file_path, os.stat(self.file_path))
+                )
+        stats = file_cache.get_stats()
+        self.assertLessEqual(stats["size"], 1000)
+        self.assertFalse(os.path.exists(first_entry))  # Least recently used
+        self.assertTrue(os.path.exists(os.path.join(self.cache_dir, ".gitignore")))
+
+        self.assertEqual(file_cache.clear(), stats["entries"])
+        self.assertEqual(file_cache.get_stats()["entries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
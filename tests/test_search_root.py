@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from ccprompt.api import Project
+from ccprompt.parsers.python_parser import FileHandler, PythonParser
+from ccprompt.parsers.search_root import SearchRoot, order_search_roots
+
+
+class TestSearchRoot(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary directory to hold test files
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.test_path = self.test_dir.name
+        self.service = os.path.join(self.test_path, "service")
+        self.library = os.path.join(self.test_path, "library")
+        self.write_test_file(self.service, "views.py", "class View(Base):\n    pass\n")
+        self.write_test_file(
+            self.service, "tests/test_views.py", "class Base:\n    pass\n"
+        )
+        self.write_test_file(self.library, "base.py", "class Base:\n    pass\n")
+        self.write_test_file(self.library, "vendor/base.py", "class Base:\n    pass\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def write_test_file(self, root, relative_path, content):
+        file_path = os.path.join(root, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def test_from_config(self):
+        search_roots = order_search_roots(
+            [
+                SearchRoot.from_config(self.library),
+                SearchRoot.from_config({"path": self.service, "priority": 10}),
+                SearchRoot.from_config({"path": self.test_path}),
+            ]
+        )
+        self.assertEqual(
+            [search_root.path for search_root in search_roots],
+            [self.service, self.library, self.test_path],
+        )
+        with self.assertRaises(ValueError):
+            SearchRoot.from_config({"priority": 1})
+
+    def test_include_and_exclude(self):
+        search_roots = [
+            SearchRoot(self.service, exclude=["tests"]),
+            SearchRoot(self.library, include=["*.py"], exclude=["vendor/*"]),
+        ]
+        options = [(1, False), (4, False)]
+        if shutil.which("git"):
+            # Git-listed files aren't pruned by a walk, excludes apply all the same
+            subprocess.run(["git", "init", "-q"], cwd=self.test_path, check=True)
+            subprocess.run(["git", "add", "."], cwd=self.test_path, check=True)
+            options.append((1, True))
+        for io_concurrency, use_git_index in options:
+            file_handler = FileHandler(
+                io_concurrency, use_git_index, search_roots=search_roots
+            )
+            # The roots are walked concurrently without read-ahead too
+            with patch.object(
+                file_handler,
+                "list_files_concurrently",
+                wraps=file_handler.list_files_concurrently,
+            ) as mock_list:
+                file_paths = list(
+                    file_handler.get_file_paths([self.service, self.library], (".py",))
+                )
+            mock_list.assert_called_once()
+            self.assertEqual(
+                file_paths,
+                [
+                    os.path.join(self.service, "views.py"),
+                    os.path.join(self.library, "base.py"),
+                ],
+            )
+
+    def test_project_search_roots(self):
+        search_roots = [
+            SearchRoot(self.library),
+            SearchRoot(self.service, priority=1, exclude=["tests"]),
+        ]
+        project = Project(self.test_path, search_roots=search_roots, io_concurrency=4)
+        result = project.extract(["View"])
+        self.assertEqual(
+            [block["file_path"] for block in result],
+            [
+                os.path.join(self.service, "views.py"),
+                os.path.join(self.library, "base.py"),
+            ],
+        )
+
+    def test_uncached_root(self):
+        cache_dir = os.path.join(self.test_path, "cache")
+        parser = PythonParser(
+            file_cache_dir=cache_dir,
+            search_roots=[
+                SearchRoot(self.service),
+                SearchRoot(self.library, cache=False),
+            ],
+        )
+        parser.build_index([self.service, self.library])
+        self.assertEqual(parser.file_cache.get_stats()["entries"], 2)
+        self.assertIsNone(parser.file_cache.get(os.path.join(self.library, "base.py")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2024 Sam Arbid.
+#
+# CCprompt is free software, you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file details.
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+from ccprompt.api import Project
+from ccprompt.main import index_main
+from ccprompt.parsers.file_limits import FileLimits
+from ccprompt.parsers.git_index import GitIndex
+from ccprompt.parsers.python_parser import DefinitionFinder, FileHandler
+from ccprompt.parsers.search_root import SearchRoot
+from ccprompt.parsers.shard_index import ShardedIndex, build_index, merge_indexes
+
+
+class TestShardedIndex(unittest.TestCase):
+    def setUp(self):
+        # Create a temporary monorepo of a few packages
+        self.test_dir = tempfile.TemporaryDirectory()
+        self.test_path = self.test_dir.name
+        self.repo = os.path.join(self.test_path, "repo")
+        self.write_file("setup.py", "def setup():\n    pass\n")
+        self.write_file(
+            "core/base.py", "class Base:\n    def run(self):\n        pass\n"
+        )
+        self.write_file(
+            "api/views.py",
+            "from core import base\n\nclass View(base.Base):\n    pass\n",
+        )
+        self.write_file("api/admin/views.py", "class AdminView(View):\n    pass\n")
+        self.write_file("tools/cli.py", "def main():\n    pass\n")
+
+    def tearDown(self):
+        self.test_dir.cleanup()
+
+    def write_file(self, relative_path, content):
+        file_path = os.path.join(self.repo, *relative_path.split("/"))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def build_merged_index(self):
+        # Build two parts separately, as on two machines, then merge them
+        first = os.path.join(self.test_path, "first")
+        second = os.path.join(self.test_path, "second")
+        merged = os.path.join(self.test_path, "merged")
+        packages = [os.path.join(self.repo, name) for name in ("core", "tools")]
+        build_index(first, packages, shard_depth=0, root=self.repo)
+        build_index(second, [os.path.join(self.repo, "api")], workers=2, root=self.repo)
+        self.assertEqual(merge_indexes(merged, [first, second]), 4)
+        return merged
+
+    def test_lookups_load_only_needed_shards(self):
+        index = ShardedIndex(self.build_merged_index(), root=self.repo)
+        record = index.find_class("base.Base")
+        self.assertEqual(
+            record["file_path"], os.path.join(self.repo, "core", "base.py")
+        )
+        self.assertEqual(len(index.shards), 1)
+
+        self.assertEqual(
+            [record["name"] for record in index.find_subclasses("Base")],
+            ["View", "AdminView"],
+        )
+        self.assertEqual(len(index.find_overrides("run")), 1)
+        self.assertEqual(index.find_definitions("missing"), [])
+        # The tools package was never touched
+        loaded = {index.get_manifest().shards[i]["directory"] for i in index.shards}
+        self.assertNotIn("tools", loaded)
+
+    def test_changed_files_are_parsed_again(self):
+        index_dir = os.path.join(self.test_path, "index")
+        self.assertEqual(build_index(index_dir, [self.repo]), 4)
+        index = ShardedIndex(index_dir)
+        self.write_file("core/base.py", "\n\nclass Base:\n    pass\n")
+        with patch.object(index, "log") as mock_log:
+            record = index.find_class("Base")
+        self.assertEqual(record["lineno"], 3)
+        mock_log.assert_called_once()
+
+    def test_index_of_another_checkout(self):
+        index_dir = os.path.join(self.repo, "__ccprompt_index__")
+        build_index(index_dir, [self.repo])
+        # A fresh checkout elsewhere: same content, new paths and mtimes
+        checkout = os.path.join(self.test_path, "checkout")
+        shutil.copytree(self.repo, checkout)
+        for root, _, files in os.walk(checkout):
+            for file in files:
+                os.utime(os.path.join(root, file), ns=(0, 0))
+        index = ShardedIndex(os.path.join(checkout, "__ccprompt_index__"))
+        with patch.object(index, "log") as mock_log:
+            record = index.find_class("Base")
+        self.assertEqual(record["file_path"], os.path.join(checkout, "core", "base.py"))
+        mock_log.assert_not_called()
+
+    def test_files_selected_like_extraction(self):
+        self.write_file("api/.tox/plugin.py", "class Plugin:\n    pass\n")
+        self.write_file("api/huge.py", "class Huge:\n    pass\n" + "#" * 1000)
+        index_dir = os.path.join(self.test_path, "index")
+        file_limits = FileLimits(max_file_size=500)
+        build_index(
+            index_dir,
+            [self.repo],
+            root=self.repo,
+            file_limits=file_limits,
+            search_roots=[SearchRoot(self.repo, exclude=["tools"])],
+        )
+        index = ShardedIndex(index_dir, root=self.repo)
+        self.assertEqual(len(index.find_definitions("View")), 1)
+        for name in ("Plugin", "Huge", "main"):
+            self.assertEqual(index.find_definitions(name), [])
+        self.assertEqual(
+            [file_path for file_path, _, _ in file_limits.report.get_entries()],
+            [os.path.join(self.repo, "api", "huge.py")],
+        )
+
+    def test_changed_files_use_the_file_limits(self):
+        index_dir = os.path.join(self.test_path, "index")
+        build_index(index_dir, [self.repo])
+        self.write_file("core/base.py", "class Base:\n    pass\n" + "#" * 1000)
+        file_limits = FileLimits(max_file_size=500)
+        index = ShardedIndex(
+            index_dir,
+            file_handler=FileHandler(file_limits=file_limits),
+            definition_finder=DefinitionFinder(file_limits),
+        )
+        self.assertIsNone(index.find_class("Base"))
+        self.assertEqual(
+            [file_path for file_path, _, _ in file_limits.report.get_entries()],
+            [os.path.join(self.repo, "core", "base.py")],
+        )
+
+    @unittest.skipUnless(shutil.which("git"), "git is required to create the index")
+    def test_git_index_read_once(self):
+        subprocess.run(["git", "init", "-q"], cwd=self.repo, check=True)
+        subprocess.run(["git", "add", "."], cwd=self.repo, check=True)
+        self.write_file("api/untracked.py", "class Junk:\n    pass\n")
+        index_dir = os.path.join(self.test_path, "index")
+        with patch.object(
+            GitIndex, "parse", autospec=True, side_effect=GitIndex.parse
+        ) as mock_parse:
+            self.assertEqual(
+                build_index(
+                    index_dir,
+                    [self.repo],
+                    root=self.repo,
+                    use_git_index=True,
+                ),
+                4,
+            )
+        mock_parse.assert_called_once()
+        index = ShardedIndex(index_dir, root=self.repo)
+        self.assertEqual(len(index.find_definitions("AdminView")), 1)
+        self.assertEqual(index.find_definitions("Junk"), [])
+
+    def test_project_uses_sharded_index(self):
+        project = Project(self.repo, shard_index_dir=self.build_merged_index())
+        with patch.object(project.parser.file_handler, "get_python_files") as mock_get:
+            result = project.extract(["AdminView"])
+        mock_get.assert_not_called()
+        self.assertEqual(
+            [block["qualname"] for block in result], ["AdminView", "View", "Base"]
+        )
+
+    def test_directories_outside_the_index_are_walked(self):
+        venv = os.path.join(self.test_path, "venv")
+        os.makedirs(venv)
+        with open(os.path.join(venv, "plugins.py"), "w", encoding="utf-8") as f:
+            f.write("from api.views import View\n\nclass Plugin(View):\n    pass\n")
+        project = Project(self.repo, venv, shard_index_dir=self.build_merged_index())
+        result = project.extract(["Plugin"], subclasses=["Base"])
+        self.assertEqual(
+            [block["qualname"] for block in result],
+            ["Plugin", "View", "Base", "View", "AdminView", "Plugin"],
+        )
+        self.assertEqual(
+            project.parser.shard_index.get_uncovered([self.repo, venv]), [venv]
+        )
+
+    def test_index_build_reads_the_configuration(self):
+        venv = os.path.join(self.test_path, "venv")
+        os.makedirs(venv)
+        with open(os.path.join(venv, "lib.py"), "w", encoding="utf-8") as f:
+            f.write("class Lib:\n    pass\n")
+        self.write_file("api/huge.py", "class Huge:\n    pass\n" + "#" * 1000)
+        config_file = os.path.join(self.test_path, "ccprompt_config.json")
+        with open(config_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "project_path": self.repo,
+                    "venv_site_packages_path": venv,
+                    "max_file_size": 500,
+                },
+                f,
+            )
+        index_dir = os.path.join(self.test_path, "index")
+        for argv, venv_indexed in (([], True), (["--exclude_venv"], False)):
+            shutil.rmtree(index_dir, ignore_errors=True)
+            with patch("sys.stdout", new_callable=io.StringIO):
+                index_main(
+                    ["build", "--config", config_file, "--index_dir", index_dir] + argv
+                )
+            index = ShardedIndex(index_dir, root=self.repo)
+            self.assertEqual(len(index.find_definitions("AdminView")), 1)
+            self.assertEqual(index.find_definitions("Huge"), [])
+            self.assertEqual(len(index.find_definitions("Lib")), int(venv_indexed))
+
+
+if __name__ == "__main__":
+    unittest.main()